@@ -0,0 +1,34 @@
+from django.db import router, transaction
+
+from .models import Accession, Job
+
+
+def job_accessions(job: Job) -> list:
+    """The accessions in the result of a job (unsaved)."""
+    accessions = []
+    for schema, result in (job.result or {}).items():
+        if not isinstance(result, dict):
+            continue
+        if not result.get("accession") and not result.get("alias"):
+            continue
+        accessions.append(
+            Accession(
+                job=job,
+                schema=schema,
+                alias=result.get("alias"),
+                accession=result.get("accession"),
+                status=result.get("status"),
+                submission_date=result.get("submission_date"),
+            )
+        )
+    return accessions
+
+
+def index_accessions(jobs: list) -> int:
+    """Replaces the indexed accessions of the jobs by the ones of their
+    results. Returns the number of indexed accessions."""
+    accessions = [accession for job in jobs for accession in job_accessions(job)]
+    with transaction.atomic(using=router.db_for_write(Accession)):
+        Accession.objects.filter(job__in=jobs).delete()
+        Accession.objects.bulk_create(accessions)
+    return len(accessions)
@@ -1,6 +1,15 @@
 from django.contrib import admin
 
-from .models import AnalysisFile, AnalysisJob, Job
+from .models import (
+    AnalysisFile,
+    AnalysisJob,
+    FileChecksum,
+    FTPUpload,
+    Job,
+    JobEvent,
+    JobRun,
+    Taxon,
+)
 
 
 @admin.register(Job)
@@ -26,3 +35,43 @@ class AnalysisJobAdmin(admin.ModelAdmin):
 @admin.register(AnalysisFile)
 class AnalysisFileAdmin(admin.ModelAdmin):
     pass
+
+
+@admin.register(FileChecksum)
+class FileChecksumAdmin(admin.ModelAdmin):
+    list_display = ("path", "md5sum", "size", "verified_at")
+    search_fields = ("path", "md5sum")
+
+
+@admin.register(FTPUpload)
+class FTPUploadAdmin(admin.ModelAdmin):
+    list_display = ("path", "filename", "md5sum", "size", "updated_at")
+    search_fields = ("path", "filename")
+
+
+@admin.register(Taxon)
+class TaxonAdmin(admin.ModelAdmin):
+    list_display = ("taxon_id", "scientific_name", "updated_at")
+    search_fields = ("taxon_id", "scientific_name")
+
+
+class JobEventInline(admin.TabularInline):
+    model = JobEvent
+    extra = 0
+
+
+@admin.register(JobRun)
+class JobRunAdmin(admin.ModelAdmin):
+    list_display = (
+        "id",
+        "job",
+        "analysis_job",
+        "kind",
+        "status",
+        "batch_size",
+        "queued_at",
+        "started_at",
+        "finished_at",
+    )
+    list_filter = ("kind", "status")
+    inlines = (JobEventInline,)
@@ -1,6 +1,18 @@
+from os.path import isdir
+
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class CoreConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "core"
+
+    def ready(self):
+        from . import signals  # noqa: F401
+
+        if settings.ENA_CHECKLIST_VALIDATION and isdir(settings.ENA_XML_TEMPLATE_DIR):
+            # Build the checklist index at startup instead of the first request
+            from .checklists import checklist_index
+
+            checklist_index()
@@ -0,0 +1,249 @@
+import contextlib
+import gc
+import io
+import platform
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from os.path import join
+
+import pandas as pd
+import yaml
+from django.conf import settings
+from django.test.utils import override_settings
+from fake_ena import receipts
+
+from . import taxonomy
+from .ena_helpers import (
+    SCHEMAS,
+    apply_template,
+    handle_sample,
+    process_receipt,
+    to_dataframe,
+)
+from .helpers import merge
+from .models import AnalysisFile, AnalysisJob, Job
+
+SIZES = [1, 10, 100, 1000, 10000]
+SCIENTIFIC_NAMES = {
+    "Homo sapiens": "9606",
+    "Mus musculus": "10090",
+    "Escherichia coli": "562",
+    "human gut metagenome": "408170",
+}
+BASE_DATA = {
+    "study": {"alias": "bench_study_{}", "title": "Study", "study_type": "Other"},
+    "sample": {
+        "alias": "bench_sample_{}",
+        "title": "Sample",
+        "taxon_id": "9606",
+        "collection date": "2023-11-27",
+        "geographic location (country and/or sea)": "Switzerland",
+    },
+    "experiment": {
+        "alias": "bench_experiment_{}",
+        "title": "Experiment",
+        "study_alias": "bench_study_{}",
+        "sample_alias": "bench_sample_{}",
+        "design_description": "None",
+        "library_strategy": "RNA-Seq",
+        "library_source": "METAGENOMIC",
+        "library_selection": "cDNA",
+        "library_layout": "single",
+        "platform": "illumina",
+        "instrument_model": "Illumina MiSeq",
+    },
+    "run": {"alias": "bench_run_{}", "experiment_alias": "bench_experiment_{}"},
+}
+
+
+def synthetic_data(size: int, suffix: str = "") -> dict:
+    """Job data with `size` additional attributes per schema."""
+    data = {"center_name": "Bench Center", "checklist": "ERC000011"}
+    for schema in SCHEMAS:
+        data[schema] = {key: value for key, value in BASE_DATA[schema].items()}
+        for index in range(size):
+            data[schema][f"attribute_{index}{suffix}"] = f"value {index}"
+    return data
+
+
+def synthetic_samples(size: int) -> pd.DataFrame:
+    """A sample table of `size` rows, half of them without taxon_id."""
+    names = list(SCIENTIFIC_NAMES)
+    return pd.DataFrame(
+        {
+            "alias": [f"bench_sample_{index}" for index in range(size)],
+            "title": [f"Sample {index}" for index in range(size)],
+            "scientific_name": [names[index % len(names)] for index in range(size)],
+            "taxon_id": [
+                None if index % 2 else SCIENTIFIC_NAMES[names[index % len(names)]]
+                for index in range(size)
+            ],
+        }
+    )
+
+
+def synthetic_receipt(size: int) -> bytes:
+    """A receipt of `size` samples, experiments and runs."""
+    documents = {
+        f"{schema}.xml": (
+            f"<{schema.upper()}_SET>"
+            + "".join(
+                f'<{schema.upper()} alias="bench_{schema}_{index}"/>'
+                for index in range(size)
+            )
+            + f"</{schema.upper()}_SET>"
+        ).encode("utf-8")
+        for schema in ["sample", "experiment", "run"]
+    }
+    actions = [("ADD", {"source": source}) for source in documents]
+    actions.append(("HOLD", {}))
+    return receipts.accepted(receipts.AccessionRegistry(), actions, documents, True)
+
+
+def bench_apply_template(size: int):
+    """Needs TEMPLATE_DIR to be a temporary directory, see `run_benchmarks`."""
+    with open(join(settings.TEMPLATE_DIR, f"bench_{size}.yml"), "w") as tf:
+        yaml.dump(synthetic_data(size, "_template"), tf)
+    data = synthetic_data(size)
+    return lambda: apply_template(Job(template=f"bench_{size}", data=data, ignore=[]))
+
+
+def bench_to_dataframe(size: int):
+    job = Job(data=synthetic_data(size), ignore=[], action="ADD")
+    return lambda: to_dataframe(job)
+
+
+def bench_handle_sample(size: int):
+    for name, taxon_id in SCIENTIFIC_NAMES.items():
+        taxonomy._remember(taxon_id, name)
+    samples = synthetic_samples(size)
+    job = Job()
+    # handle_sample fills in the table, so every run gets a fresh copy
+    return lambda: handle_sample(job, samples.copy())
+
+
+def bench_process_receipt(size: int):
+    receipt = synthetic_receipt(size)
+    return lambda: process_receipt(receipt, "ADD")
+
+
+def bench_merge(size: int):
+    template = synthetic_data(size, "_template")
+    data = synthetic_data(size)
+    return lambda: merge(template, data)
+
+
+def bench_clone(size: int):
+    job = Job(data=synthetic_data(size), ignore=[], action="ADD", status="SUBMITTED")
+    job.result = {
+        schema: {"alias": f"bench_{schema}", "accession": "ER1", "status": "ADDED"}
+        for schema in SCHEMAS
+    }
+    return lambda: job.clone(None, "MODIFY")
+
+
+def bench_manifest(size: int):
+    """Stores a job with its analysis, needs to run in a transaction."""
+    job = Job.objects.create(data=synthetic_data(1), status="SUBMITTED")
+    job.result = {
+        "experiment": {"study_alias": "ERP1", "sample_alias": "ERS1"},
+        "run": {"accession": "ERR1"},
+    }
+    job.save()
+    analysis_job = AnalysisJob.objects.create(
+        job=job, data={f"attribute_{index}": index for index in range(size)}
+    )
+    AnalysisFile.objects.bulk_create(
+        AnalysisFile(
+            job=analysis_job, file_name=f"/data/bench_{index}.fasta", file_type="FASTA"
+        )
+        for index in range(min(size, 100))
+    )
+
+    def run():
+        # The manifest prints its data
+        with contextlib.redirect_stdout(io.StringIO()):
+            return analysis_job.manifest
+
+    return run
+
+
+CASES = {
+    "apply_template": bench_apply_template,
+    "to_dataframe": bench_to_dataframe,
+    "handle_sample": bench_handle_sample,
+    "process_receipt": bench_process_receipt,
+    "merge": bench_merge,
+    "clone": bench_clone,
+    "manifest": bench_manifest,
+}
+
+
+def measure(run, min_time: float, max_runs: int) -> dict:
+    """Times `run` for at least `min_time` seconds (or `max_runs` runs) and
+    measures its peak memory in a separate traced run."""
+    run()  # warm up
+    gc.collect()
+    runs = 0
+    started = time.perf_counter()
+    elapsed = 0.0
+    while runs < max_runs and (runs == 0 or elapsed < min_time):
+        run()
+        runs += 1
+        elapsed = time.perf_counter() - started
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        "runs": runs,
+        "seconds": elapsed,
+        "ops_per_sec": runs / elapsed if elapsed else None,
+        "peak_memory_bytes": peak,
+    }
+
+
+def run_benchmarks(cases, sizes, min_time: float = 1.0, max_runs: int = 1000):
+    """Runs the cases for all sizes. Yields a result per case and size."""
+    with tempfile.TemporaryDirectory(prefix="bench_templates_") as template_dir:
+        with override_settings(TEMPLATE_DIR=template_dir):
+            for name in cases:
+                for size in sizes:
+                    result = measure(CASES[name](size), min_time, max_runs)
+                    yield {"name": name, "size": size, **result}
+
+
+def metadata() -> dict:
+    return {
+        "version": settings.ENA_SUBMISSION_TOOL_VERSION,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "machine": platform.machine(),
+        "node": platform.node(),
+    }
+
+
+def compare(results: list, baseline: list) -> list:
+    """Returns (name, size, baseline ops/sec, ops/sec, ratio) tuples."""
+    base = {(result["name"], result["size"]): result for result in baseline}
+    rows = []
+    for result in results:
+        old = base.get((result["name"], result["size"]))
+        if old and old["ops_per_sec"] and result["ops_per_sec"]:
+            rows.append(
+                (
+                    result["name"],
+                    result["size"],
+                    old["ops_per_sec"],
+                    result["ops_per_sec"],
+                    result["ops_per_sec"] / old["ops_per_sec"],
+                )
+            )
+    return rows
@@ -0,0 +1,205 @@
+import math
+import re
+import threading
+from glob import glob
+from os.path import basename, join
+
+from django.conf import settings
+from lxml import etree
+from rest_framework.exceptions import ValidationError
+
+from core import log
+
+from .ena_helpers import SCHEMAS
+from .xml_builder import SCHEMA_TEMPLATES
+
+PY_NS = "{http://genshi.edgewall.org/}"
+XI_INCLUDE = "{http://www.w3.org/2001/XInclude}include"
+MANDATORY_RE = re.compile(r"mandatorytest\(row, '([^']+)'")
+ALLOWED_RE = re.compile(r"row\.(\w+)\.lower\(\)\.strip\(\) == '([^']*)'")
+SAMPLE_TEMPLATE_RE = re.compile(r"ENA_template_samples_(ERC\d+)\.xml")
+
+# Mandatory fields that are filled in by the service: a sample needs either a
+# taxon_id or a scientific_name and the file_type of a run is taken from the
+# files of the job.
+ALTERNATIVES = {"sample": {"taxon_id": "scientific_name"}}
+DERIVED = {"run": {"file_type"}}
+
+
+def is_missing(value):
+    """A missing mandatory value, like the `mandatorytest` of the templates:
+    None, NaN or only whitespace. An empty string is accepted by ENA."""
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return True
+    return str(value).isspace()
+
+
+def is_blank(value):
+    return value is None or not str(value).strip()
+
+
+def normalize(value):
+    return str(value).lower().strip()
+
+
+class Checklist:
+    """The mandatory fields and allowed values of an ENA XML template.
+
+    An allowed value can depend on the value of another field (e.g. the
+    instrument_model on the platform), so the allowed values are kept per
+    condition, which is either None or a (field, value) tuple.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.mandatory = []
+        self.allowed = {}
+
+    def add_mandatory(self, field: str):
+        if field not in self.mandatory:
+            self.mandatory.append(field)
+
+    def add_allowed(self, field: str, value: str, condition=None):
+        self.allowed.setdefault(field, {}).setdefault(condition, set()).add(value)
+
+    def violations(self, schema: str, row: dict) -> list:
+        """Returns all violations of a row (the data of a schema)."""
+        errors = []
+        alternatives = ALTERNATIVES.get(schema, {})
+        derived = DERIVED.get(schema, set())
+        for field in self.mandatory:
+            if field in derived or not is_missing(row.get(field)):
+                continue
+            alternative = alternatives.get(field)
+            if alternative and not is_missing(row.get(alternative)):
+                continue
+            if alternative:
+                errors.append(
+                    f"The mandatory field '{field}' (or '{alternative}') is missing."
+                )
+            else:
+                errors.append(f"The mandatory field '{field}' is missing.")
+        for field, by_condition in self.allowed.items():
+            value = row.get(field)
+            if is_blank(value):
+                continue
+            for condition, values in by_condition.items():
+                if condition is not None:
+                    other, other_value = condition
+                    if is_blank(row.get(other)) or normalize(row[other]) != other_value:
+                        continue
+                if normalize(value) not in values:
+                    errors.append(
+                        f"'{value}' is not an allowed value of '{field}'. "
+                        f"Allowed values are: {', '.join(sorted(values))}."
+                    )
+        return errors
+
+
+class ChecklistParser:
+    """Collects the mandatory fields and allowed values of a template.
+
+    The included templates (e.g. ENA_template_PLATFORM.xml) are parsed once
+    and shared by all templates.
+    """
+
+    def __init__(self, template_dir: str):
+        self.template_dir = template_dir
+        self.documents = {}
+
+    def document(self, name: str):
+        if name not in self.documents:
+            self.documents[name] = etree.parse(join(self.template_dir, name))
+        return self.documents[name]
+
+    def parse(self, name: str) -> Checklist:
+        checklist = Checklist(name)
+        self.__walk(checklist, self.document(name).getroot(), None)
+        return checklist
+
+    def __walk(self, checklist: Checklist, element, condition):
+        if element.tag == XI_INCLUDE:
+            included = self.document(element.get("href")).getroot()
+            self.__walk(checklist, included, condition)
+            return
+        if not isinstance(element.tag, str):
+            # Comments and processing instructions
+            return
+        tests = [element.get(f"{PY_NS}when"), element.get(f"{PY_NS}if")]
+        if element.tag in [f"{PY_NS}when", f"{PY_NS}if"]:
+            tests.append(element.get("test"))
+        for test in filter(None, tests):
+            for field in MANDATORY_RE.findall(test):
+                checklist.add_mandatory(field)
+            match = ALLOWED_RE.search(test)
+            if match:
+                field, value = match.groups()
+                checklist.add_allowed(field, value, condition)
+                # The nested choices depend on this value
+                condition = (field, value)
+        for child in element:
+            self.__walk(checklist, child, condition)
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def checklist_index() -> dict:
+    """The checklists of all shipped templates, built once per process.
+
+    The keys are the schemas (`study`, `experiment`, `run`) and the sample
+    checklists (e.g. `ERC000011`).
+    """
+    global _index
+    with _index_lock:
+        if _index is None:
+            template_dir = settings.ENA_XML_TEMPLATE_DIR
+            parser = ChecklistParser(template_dir)
+            index = {
+                schema: parser.parse(name) for schema, name in SCHEMA_TEMPLATES.items()
+            }
+            for path in sorted(glob(join(template_dir, "ENA_template_samples_*.xml"))):
+                match = SAMPLE_TEMPLATE_RE.fullmatch(basename(path))
+                if match:
+                    index[match.group(1)] = parser.parse(basename(path))
+            log.debug(f"Indexed {len(index)} checklists of {template_dir}")
+            _index = index
+        return _index
+
+
+def validate_data(data: dict, action: str, ignore=()) -> dict:
+    """Validates the job data against the checklists.
+
+    Returns the violations by schema, which is empty if the data is valid.
+    """
+    errors = {}
+    if action not in ["ADD", "MODIFY"]:
+        return errors
+    index = checklist_index()
+    for schema in SCHEMAS:
+        row = data.get(schema)
+        if schema in (ignore or ()) or not isinstance(row, dict):
+            continue
+        if schema == "sample":
+            checklist = index.get(data.get("checklist"))
+            if checklist is None:
+                errors[schema] = [
+                    f"The checklist '{data.get('checklist')}' is not supported."
+                ]
+                continue
+        else:
+            checklist = index[schema]
+        violations = checklist.violations(schema, row)
+        if violations:
+            errors[schema] = violations
+    return errors
+
+
+def check_job(job):
+    """Raises a ValidationError with all violations if the job is invalid."""
+    if not settings.ENA_CHECKLIST_VALIDATION:
+        return
+    errors = validate_data(job.data, job.action, job.ignore)
+    if errors:
+        raise ValidationError(errors)
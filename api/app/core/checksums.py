@@ -0,0 +1,114 @@
+import hashlib
+import mmap
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from os import stat
+from os.path import abspath
+
+from django.conf import settings
+
+from core import log
+
+from .models import FileChecksum
+
+
+def file_signature(path: str):
+    """The attributes that identify an unchanged file."""
+    st = stat(path)
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "inode": st.st_ino}
+
+
+def cached_md5(path: str):
+    """Returns the cached md5 sum of the file, or None if it may have changed."""
+    path = abspath(path)
+    return (
+        FileChecksum.objects.filter(path=path, **file_signature(path))
+        .values_list("md5sum", flat=True)
+        .first()
+    )
+
+
+def store_md5(path: str, md5sum: str, signature: dict):
+    """Caches the md5 sum, if the file did not change while it was hashed."""
+    path = abspath(path)
+    if file_signature(path) != signature:
+        log.warning(f"File {path} changed while hashing, not caching its md5 sum.")
+        return
+    FileChecksum.objects.update_or_create(
+        path=path, defaults={"md5sum": md5sum, **signature}
+    )
+
+
+def md5_file(path: str):
+    """Hashes a file in large chunks, memory mapped where possible."""
+    chunk_size = settings.ENA_HASH_CHUNK_SIZE
+    md5 = hashlib.md5()
+    with open(path, "rb") as fh:
+        try:
+            mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, OSError):
+            # Empty files and some network file systems cannot be mapped
+            mm = None
+        if mm is None:
+            for chunk in iter(lambda: fh.read(chunk_size), b""):
+                md5.update(chunk)
+        else:
+            with mm:
+                if hasattr(mm, "madvise"):
+                    mm.madvise(mmap.MADV_SEQUENTIAL)
+                with memoryview(mm) as view:
+                    for offset in range(0, len(view), chunk_size):
+                        md5.update(view[offset : offset + chunk_size])
+    return md5.hexdigest()
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def hash_executor():
+    """The process wide pool hashing files concurrently.
+
+    hashlib releases the GIL while hashing large buffers, so threads are
+    enough to hash several files on several cores.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.ENA_HASH_WORKERS, thread_name_prefix="md5"
+            )
+        return _executor
+
+
+def get_md5s(paths: list, force: bool = False):
+    """Returns the md5 sums of several files as a dictionary by path.
+
+    Files without a valid cache entry are hashed concurrently.
+    """
+    paths = [abspath(path) for path in paths]
+    md5sums = {} if force else {path: cached_md5(path) for path in paths}
+    missing = [path for path in paths if not md5sums.get(path)]
+    signatures = {path: file_signature(path) for path in missing}
+    for path, md5sum in zip(missing, hash_executor().map(md5_file, missing)):
+        store_md5(path, md5sum, signatures[path])
+        md5sums[path] = md5sum
+    return md5sums
+
+
+def get_md5(path: str, force: bool = False):
+    """Returns the md5 sum of a file.
+
+    Unchanged files (same path, size, mtime and inode) are never hashed
+    twice, unless `force` is set to re-verify the cached checksum.
+    """
+    path = abspath(path)
+    if not force:
+        md5sum = cached_md5(path)
+        if md5sum:
+            log.debug(f"Using cached md5 sum of {path}")
+            return md5sum
+    signature = file_signature(path)
+    md5sum = hash_executor().submit(md5_file, path).result()
+    store_md5(path, md5sum, signature)
+    return md5sum
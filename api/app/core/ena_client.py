@@ -0,0 +1,136 @@
+import threading
+import time
+from urllib.parse import quote
+
+import requests
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
+from requests.adapters import HTTPAdapter
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from urllib3.util.retry import Retry
+
+from core import log
+
+from . import metrics
+
+
+class ENAUnavailableError(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = _("The ENA service is temporarily unavailable.")
+    default_code = "ena_unavailable"
+
+
+def record(endpoint: str, seconds: float, status_code: int = None):
+    """Counts a request, failed if it got no response or a server error."""
+    metrics.inc("ena_upload_http_requests_total", endpoint=endpoint)
+    if status_code is None or status_code >= 500:
+        metrics.inc("ena_upload_http_errors_total", endpoint=endpoint)
+    metrics.observe("ena_upload_http_request_seconds", seconds, endpoint=endpoint)
+
+
+class ENAClient:
+    """HTTP client with a keep-alive connection pool shared by all threads.
+
+    Every request has a connect and a read timeout. Failed connects are
+    retried for all requests, failed reads and 502/503/504 responses only for
+    idempotent (GET, HEAD) requests.
+    """
+
+    def __init__(self):
+        retry = Retry(
+            total=settings.ENA_HTTP_RETRIES,
+            connect=settings.ENA_HTTP_RETRIES,
+            read=settings.ENA_HTTP_RETRIES,
+            status=settings.ENA_HTTP_RETRIES,
+            allowed_methods=frozenset(["GET", "HEAD"]),
+            status_forcelist=(502, 503, 504),
+            backoff_factor=settings.ENA_HTTP_BACKOFF_SECS,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=settings.ENA_HTTP_POOL_SIZE,
+            pool_maxsize=settings.ENA_HTTP_POOL_SIZE,
+            max_retries=retry,
+        )
+        self.session = requests.Session()
+        self.session.trust_env = False
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def request(self, endpoint: str, method: str, url: str, **kwargs):
+        """Sends a request, counted and timed in `core.metrics` by endpoint
+        (`submit`, `taxonomy`)."""
+        kwargs.setdefault(
+            "timeout",
+            (settings.ENA_HTTP_CONNECT_TIMEOUT, settings.ENA_HTTP_READ_TIMEOUT),
+        )
+        started = time.monotonic()
+        try:
+            response = self.session.request(method, url, **kwargs)
+        except requests.RequestException as ex:
+            record(endpoint, time.monotonic() - started)
+            log.warning(f"{method} {url} failed: {ex}")
+            raise ENAUnavailableError(f"Cannot reach ENA ({endpoint}): {ex}")
+        elapsed = time.monotonic() - started
+        record(endpoint, elapsed, response.status_code)
+        log.debug(f"{method} {url}: HTTP {response.status_code} in {elapsed:.3f}s")
+        return response
+
+    def get(self, endpoint: str, url: str, **kwargs):
+        return self.request(endpoint, "GET", url, **kwargs)
+
+    def post(self, endpoint: str, url: str, **kwargs):
+        return self.request(endpoint, "POST", url, **kwargs)
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def ena_client() -> ENAClient:
+    """The process wide ENA client."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = ENAClient()
+        return _client
+
+
+def check_available(response, endpoint: str):
+    """Raises an ENAUnavailableError on a server error of ENA."""
+    if response.status_code >= 500:
+        raise ENAUnavailableError(
+            f"ENA ({endpoint}) responded with HTTP {response.status_code}"
+        )
+
+
+def json_or_none(response):
+    if response.status_code != 200:
+        return None
+    try:
+        return response.json()
+    except ValueError:
+        return None
+
+
+def lookup_taxon_id(scientific_name: str):
+    """Returns the taxon id and the canonical scientific name of a scientific
+    name, or None if it is unknown."""
+    response = ena_client().get(
+        "taxonomy",
+        f"{settings.ENA_TAXONOMY_URL}/scientific-name/{quote(scientific_name)}",
+    )
+    check_available(response, "taxonomy")
+    result = json_or_none(response)
+    return (result[0]["taxId"], result[0]["scientificName"]) if result else None
+
+
+def lookup_scientific_name(taxon_id: str):
+    """Returns the scientific name of a taxon id, or None if it is unknown."""
+    response = ena_client().get(
+        "taxonomy", f"{settings.ENA_TAXONOMY_URL}/tax-id/{quote(taxon_id)}"
+    )
+    check_available(response, "taxonomy")
+    result = json_or_none(response)
+    return result.get("scientificName") if result else None
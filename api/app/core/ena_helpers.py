@@ -1,27 +1,32 @@
 import json
 import re
+import shlex
 import tempfile
 from datetime import datetime as dt
-from os.path import abspath, basename, isfile, join, splitext
+from os.path import abspath, basename, isfile, splitext
 
 import pandas as pd
-import yaml
 from box import Box
 from constance import config
 from django.conf import settings
 from django.utils import timezone as tz
-from django.utils.translation import gettext_lazy as _
 from ena_upload import ena_upload as ena
 from ena_upload_ms.dynamic_settings import dynamic_settings
 from lxml import etree
-from rest_framework import status
-from rest_framework.exceptions import APIException, ValidationError
+from rest_framework.exceptions import ValidationError
 from sh import Command, ErrorReturnCode
 
 from core import log
 
+from . import metrics, taxonomy, timings, xml_builder, xsd
+from .accessions import index_accessions
+from .checksums import cached_md5, file_signature, store_md5
+from .ena_client import ENAUnavailableError, ena_client
+from .ftp import upload_files
 from .helpers import merge
 from .models import AnalysisJob, File, Job
+from .ratelimit import rate_limiter
+from .template_registry import get_template, template_file_path
 
 SCHEMAS = ["study", "sample", "experiment", "run"]
 STATUS_CHANGES = {
@@ -30,49 +35,43 @@ STATUS_CHANGES = {
     "CANCEL": "CANCELLED",
     "RELEASE": "RELEASED",
 }
-
-
-class FTPUploadError(APIException):
-    status_code = status.HTTP_400_BAD_REQUEST
-    default_detail = _("File(s) could not be uploaded via FTP.")
-    default_code = "ftp_upload_error"
+# Stand-ins of the values that are not computed when a job is only validated
+PLACEHOLDER_MD5 = "0" * 32
+PLACEHOLDER_TAXON_ID = "0"
+PLACEHOLDER_SCIENTIFIC_NAME = "unresolved"
 
 
 def apply_template(job: Job):
     if not job.template:
         job.template = "default"
 
-    template_file = join(settings.TEMPLATE_DIR, f"{job.template}.yml")
-    log.debug(f"Template file: {template_file}")
-    if isfile(template_file):
-        log.debug("Template file found.")
-        with open(template_file, "r") as cf:
-            # We use BaseLoader to handle all values as string
-            template = yaml.load(cf, Loader=yaml.BaseLoader)
-            # Remove the ignored parts
-            for ignore in job.ignore:
-                if ignore in template:
-                    del template[ignore]
-            # now merge the data
-            new_data = merge(template, job.data)
-            # Replace all {} in the alias values with the timestamp
-            ts = dt.strftime(tz.now(), "%Y%m%d%H%M%S%f")
-            for schema in SCHEMAS:
-                if schema in new_data:
-                    for key, value in new_data[schema].items():
-                        if key.endswith("alias"):
-                            new_data[schema][key] = value.replace("{}", ts)
-            # remove all sections that are not in the extended schema list
-            for key in set(new_data.keys()).difference(
-                set(SCHEMAS + ["center_name", "laboratory", "checklist"])
-            ):
-                del new_data[key]
-            job.data = new_data
-    else:
+    template = get_template(job.template)
+    if template is None:
+        template_file = template_file_path(job.template)
         log.warning(f"Template file not found: {template_file}")
         # Template not found
         raise ValidationError(f"Template file not found: {template_file}")
 
+    # Remove the ignored parts and merge the data
+    new_data = merge(template.thaw(ignore=job.ignore or ()), job.data)
+    # Replace all {} in the alias values with the timestamp
+    ts = dt.strftime(tz.now(), "%Y%m%d%H%M%S%f")
+    for schema in SCHEMAS:
+        if schema in new_data:
+            alias_keys = set(template.alias_keys.get(schema, ())) | {
+                key for key in job.data.get(schema, {}) if key.endswith("alias")
+            }
+            for key in alias_keys:
+                value = new_data[schema].get(key)
+                if isinstance(value, str):
+                    new_data[schema][key] = value.replace("{}", ts)
+    # remove all sections that are not in the extended schema list
+    for key in set(new_data.keys()).difference(
+        set(SCHEMAS + ["center_name", "laboratory", "checklist"])
+    ):
+        del new_data[key]
+    job.data = new_data
+
 
 def to_dataframe(job: Job):
     """Converts the config to the required dataframe"""
@@ -96,43 +95,18 @@ def to_dataframe(job: Job):
     return schema_dataframe
 
 
-def submit_data(file_paths: str):
+def submit_data(file_paths: dict, expected_md5: dict = None):
     """Submit data to webin ftp server.
 
+    The files are uploaded over the pooled FTPS sessions, see `core.ftp`.
+
     :param file_paths: a dictionary of filename string and file_path string
-    :param args: the command-line arguments parsed by ArgumentParser
+    :param expected_md5: an optional dictionary of filename string and the
+        known md5 sum of the file
+    :return: a dictionary of filename string and the md5 sum of the uploaded
+        bytes
     """
-    ftp_host = "webin2.ebi.ac.uk"
-
-    log.info("\nConnecting to webin2.ebi.ac.uk....")
-    try:
-        ftps = ena.MyFTP_TLS(timeout=120)
-        ftps.context.set_ciphers("HIGH:!DH:!aNULL")
-        ftps.connect(ftp_host, port=21)
-        ftps.auth()
-        # log.debug(f"U/N, P/W: {settings.ENA_USERNAME}, {settings.ENA_PASSWORD}")
-        ftps.login(settings.ENA_USERNAME, settings.ENA_PASSWORD)
-        ftps.prot_p()
-    except IOError as ioe:
-        log.error(
-            "ERROR: could not connect to the ftp server.\
-               Please check your login details."
-        )
-        log.error(ioe)
-        raise FTPUploadError(
-            f"Cannot connect to the ftp server {ftp_host} while intending to upload file {file_paths}: {ioe}"
-        )
-    for filename, path in file_paths.items():
-        log.info(f"Uploading {path}...")
-        try:
-            log.info(ftps.storbinary(f"STOR {filename}", open(path, "rb")))
-        except BaseException as err:
-            log.error(f"ERROR: {err}")
-            log.error(
-                "ERROR: If your connection times out at this stage, it probably is because of a firewall that is in place. FTP is used in passive mode and connection will be opened to one of the ports: 40000 and 50000."
-            )
-            raise FTPUploadError(f"Cannot upload file {path} to {ftp_host}: {err}")
-    log.info(ftps.quit())
+    return upload_files(file_paths, expected_md5)
 
 
 def evaluate_file_type(file):
@@ -146,62 +120,148 @@ def evaluate_file_type(file):
         raise ValidationError(f"Cannot determine file type: {file}.")
 
 
-def handle_run(job: Job, schema_target):
-    df = schema_target
+def run_files(job: Job) -> dict:
+    """The run files of the job as a dictionary of filename and absolute path."""
     file_paths = {}
-    if job.files:
-        for file in job.files:
-            log.debug(f"Handle file {file}...")
-            if not isfile(file):
-                raise ValidationError(f"File does not exist: {file}.")
-            File.objects.update_or_create(
-                file_name=abspath(file),
-                defaults={
-                    "job": job,
-                    "file_type": evaluate_file_type(file),
-                    "md5sum": ena.get_md5(file),
-                },
-            )
-            file_paths[basename(file)] = abspath(file)
+    for file in job.files:
+        log.debug(f"Handle file {file}...")
+        if not isfile(file):
+            raise ValidationError(f"File does not exist: {file}.")
+        file_paths[basename(file)] = abspath(file)
+    return file_paths
+
 
-        file_md5 = {
-            filename: ena.get_md5(path) for filename, path in file_paths.items()
+def handle_run(job: Job, schema_target):
+    """Returns the run table with one row per file, or None without files.
+
+    The files are not hashed: the checksums are their cached md5 sums or a
+    placeholder until the files are uploaded, see `upload_run`.
+    """
+    if not job.files:
+        return None
+    with timings.stage("md5") as stats:
+        file_paths = run_files(job)
+        file_md5 = {filename: cached_md5(path) for filename, path in file_paths.items()}
+        stats["info"] = {
+            "files": len(file_paths),
+            "cached": len([md5sum for md5sum in file_md5.values() if md5sum]),
         }
-        pd.concat([df] * len(file_md5), ignore_index=True)
-        df["file_name"] = file_md5.keys()
-        df["file_type"] = [evaluate_file_type(file) for file in file_md5.keys()]
-        df["file_checksum"] = file_md5.values()
 
+    # One row per file
+    df = pd.concat([schema_target] * len(file_md5), ignore_index=True)
+    df["file_name"] = list(file_md5.keys())
+    df["file_type"] = [evaluate_file_type(file) for file in file_md5.keys()]
+    df["file_checksum"] = [md5sum or PLACEHOLDER_MD5 for md5sum in file_md5.values()]
+    return df
+
+
+def upload_run(job: Job, schema_target):
+    """Uploads the run files of a job.
+
+    The checksums of the run table are replaced by the md5 sums of the
+    uploaded bytes.
+    """
+    file_paths = run_files(job)
+    signatures = {path: file_signature(path) for path in file_paths.values()}
+    # Files are hashed while they are uploaded, a cached md5 sum is only used
+    # to verify the upload
+    expected_md5 = {
+        filename: md5sum
+        for filename, md5sum in zip(
+            schema_target["file_name"], schema_target["file_checksum"]
+        )
+        if md5sum != PLACEHOLDER_MD5
+    }
+    with timings.stage("ftp") as stats:
+        stats["bytes"] = sum(signature["size"] for signature in signatures.values())
+        stats["info"] = {"files": len(file_paths)}
         # ena.submit_data(file_paths, settings.ENA_PASSWORD, settings.ENA_USERNAME)
-        submit_data(file_paths)
-        return df
-    else:
-        return None
+        file_md5 = submit_data(file_paths, expected_md5)
+    for filename, path in file_paths.items():
+        store_md5(path, file_md5[filename], signatures[path])
+        File.objects.update_or_create(
+            file_name=path,
+            defaults={
+                "job": job,
+                "file_type": evaluate_file_type(path),
+                "md5sum": file_md5[filename],
+            },
+        )
+    schema_target["file_checksum"] = schema_target["file_name"].map(file_md5)
 
 
-def handle_sample(job: Job, schema_target):
+def handle_sample(job: Job, schema_target, offline: bool = False):
+    """Completes the taxon ids and scientific names of the samples.
+
+    If `offline` is set, they are only taken from the taxonomy cache, the ones
+    not found are filled with placeholders.
+    """
     df = schema_target
     log.info("Retrieving taxon IDs and scientific names if needed")
-    for index, row in df.iterrows():
-        if pd.notna(row["scientific_name"]) and pd.isna(row["taxon_id"]):
-            # retrieve taxon id using scientific name
-            taxonID = ena.get_taxon_id(row["scientific_name"])
-            df.loc[index, "taxon_id"] = taxonID
-        elif pd.notna(row["taxon_id"]) and pd.isna(row["scientific_name"]):
-            # retrieve scientific name using taxon id
-            scientificName = ena.get_scientific_name(row["taxon_id"])
-            df.loc[index, "scientific_name"] = scientificName
-        elif pd.isna(row["taxon_id"]) and pd.isna(row["scientific_name"]):
-            raise ValidationError(
-                f"No taxon_id or scientific_name was given with sample {row['alias']}."
-            )
+    missing_id = df["taxon_id"].isna()
+    missing_name = df["scientific_name"].isna()
+    missing_both = missing_id & missing_name
+    if missing_both.any():
+        aliases = ", ".join(map(str, df.loc[missing_both, "alias"]))
+        raise ValidationError(
+            f"No taxon_id or scientific_name was given with sample(s) {aliases}."
+        )
+
+    # Resolve every distinct name and id only once
+    names = df.loc[missing_id, "scientific_name"].drop_duplicates()
+    taxon_ids = df.loc[missing_name, "taxon_id"].drop_duplicates()
+    with timings.stage("taxonomy") as stats:
+        stats["info"] = {"names": len(names), "taxon_ids": len(taxon_ids)}
+        taxonomy.prefetch(scientific_names=names, taxon_ids=taxon_ids)
+        id_by_name = {
+            name: taxonomy.get_taxon_id(name, offline=offline) or PLACEHOLDER_TAXON_ID
+            for name in names
+        }
+        name_by_id = {
+            taxon_id: taxonomy.get_scientific_name(taxon_id, offline=offline)
+            or PLACEHOLDER_SCIENTIFIC_NAME
+            for taxon_id in taxon_ids
+        }
+    if not names.empty:
+        df.loc[missing_id, "taxon_id"] = df.loc[missing_id, "scientific_name"].map(
+            id_by_name
+        )
+    if not taxon_ids.empty:
+        df.loc[missing_name, "scientific_name"] = df.loc[missing_name, "taxon_id"].map(
+            name_by_id
+        )
     log.info("Taxon IDs and scientific names are retrieved")
     return df
 
 
-def ena_upload(job: Job):
-    schema_dataframe = to_dataframe(job)
-    schema_targets = ena.extract_targets(job.action, schema_dataframe)
+def prepare_upload(job: Job, offline: bool = False):
+    """Validates the job and prepares its targets for the submission.
+
+    Completes the sample taxonomy and lists the run files, which are neither
+    hashed nor uploaded yet (see `upload_job`). Returns the schema dataframes
+    and the schema targets of the job.
+
+    If `offline` is set, the taxonomy is only looked up in the cache and the
+    unknown values are replaced by placeholders, e.g. to only validate a job.
+    """
+    center = job.data.get("center_name")
+    log.debug(f"Using center {center}")
+    if not center:
+        raise ValidationError(
+            "Center is not defined. Please specify 'center_name' in the config."
+        )
+    checklist = job.data.get("checklist")
+    log.debug(f"Using checklist {checklist}")
+    if not checklist:
+        raise ValidationError(
+            "Checklist is not defined. Please specify 'checklist' in the config."
+        )
+    if job.action not in ["ADD", "MODIFY", "CANCEL", "RELEASE"]:
+        raise ValidationError(f"The action {job.action} is not supported.")
+
+    with timings.stage("dataframe"):
+        schema_dataframe = to_dataframe(job)
+        schema_targets = ena.extract_targets(job.action, schema_dataframe)
     if not schema_targets:
         raise ValidationError(
             f"There is no table submitted having at least one row with {job.action} as action in the status column."
@@ -214,140 +274,332 @@ def ena_upload(job: Job):
                 del schema_targets["run"]
 
         if "sample" in schema_targets:
-            schema_targets["sample"] = handle_sample(job, schema_targets["sample"])
+            schema_targets["sample"] = handle_sample(
+                job, schema_targets["sample"], offline=offline
+            )
 
-    # base_path = abspath(dirname(ena.__file__))
-    # template_path = join(base_path, "templates")
-    template_path = "/ena_templates"
+    return schema_dataframe, schema_targets
 
-    center = job.data.get("center_name")
-    log.debug(f"Using center {center}")
-    if not center:
-        raise ValidationError(
-            "Center is not defined. Please specify 'center_name' in the config."
+
+def upload_job(job: Job, schema_dataframe, schema_targets):
+    """Validates the XMLs of a prepared job, then uploads its run files.
+
+    Invalid XMLs are rejected before any file is uploaded, with the cached
+    md5 sums (or placeholders) as checksums of the run files.
+    """
+    if settings.ENA_XSD_VALIDATION:
+        with timings.stage("xml_build"):
+            schema_xmls, submission_xml = build_xmls(
+                [(job, schema_dataframe, schema_targets)]
+            )
+        with timings.stage("xsd_validate"):
+            xsd.check_xmls({**schema_xmls, "submission": submission_xml})
+    if "run" in schema_targets:
+        upload_run(job, schema_targets["run"])
+
+
+def send_xmls(schema_xmls: dict, url: str):
+    """Sends the in-memory XMLs (schema and bytes) to the ENA drop-box."""
+    files = [
+        (
+            schema.upper(),
+            (xml_builder.source_name(schema), xml, "application/xml"),
         )
+        for schema, xml in schema_xmls.items()
+    ]
+    return ena_client().post(
+        "submit",
+        url,
+        auth=(settings.ENA_USERNAME, settings.ENA_PASSWORD),
+        files=files,
+    )
+
+
+def build_xmls(prepared: list):
+    """Builds the XMLs of prepared jobs, see `submit_upload`.
+
+    Returns the schema XMLs and the submission XML as bytes.
+    """
+    job = prepared[0][0]
+    action = job.action
+    center = job.data.get("center_name")
     checklist = job.data.get("checklist")
-    log.debug(f"Using checklist {checklist}")
-    if not checklist:
-        raise ValidationError(
-            "Checklist is not defined. Please specify 'checklist' in the config."
-        )
+
     tool = {
         "tool_name": settings.ENA_SUBMISSION_TOOL,
         "tool_version": settings.ENA_SUBMISSION_TOOL_VERSION,
     }
 
-    if job.action in ["ADD", "MODIFY"]:
-        schema_xmls = ena.run_construct(
-            template_path,
-            schema_targets,
-            center,
-            checklist,
-            tool,
-        )
+    # Combine the targets of all jobs into one set per schema
+    combined_targets = {}
+    for schema in SCHEMAS:
+        targets = [
+            schema_targets[schema]
+            for _, _, schema_targets in prepared
+            if schema in schema_targets
+        ]
+        if targets:
+            combined_targets[schema] = pd.concat(targets, ignore_index=True)
 
-        submission_xml = ena.construct_submission(
-            template_path, job.action, schema_xmls, center, checklist, tool
-        )
-    elif job.action in ["CANCEL", "RELEASE"]:
+    if action in ["ADD", "MODIFY"]:
+        schema_xmls = xml_builder.schema_xmls(combined_targets, center, checklist, tool)
+        submission_xml = xml_builder.submission_xml(action, schema_xmls, center, tool)
+    else:
         schema_xmls = {}
-        submission_xml = ena.construct_submission(
-            template_path, job.action, schema_targets, center, checklist, tool
+        submission_xml = xml_builder.submission_xml(
+            action, combined_targets, center, tool
         )
-    else:
-        raise ValidationError(f"The action {job.action} is not supported.")
+    return schema_xmls, submission_xml
 
-    job.submission = {
-        schema: json.loads(target.to_json(orient="records"))[0]
-        for schema, target in schema_targets.items()
-    }
-    with open(submission_xml, "r") as sf:
-        job.raw_submission = sf.read()
+
+def submit_upload(prepared: list):
+    """Submits prepared jobs to ENA in one single drop-box submission.
+
+    :param prepared: a list of (job, schema_dataframe, schema_targets) tuples
+        as returned by `prepare_upload`, whose run files are uploaded (see
+        `upload_job`). All jobs must share the action, the center and the
+        checklist.
+    """
+    action = prepared[0][0].action
+    with timings.stage("xml_build") as stats:
+        schema_xmls, submission_xml = build_xmls(prepared)
+        stats["bytes"] = len(submission_xml) + sum(map(len, schema_xmls.values()))
+
+    raw_submission = submission_xml.decode("utf-8")
+    for job, _, schema_targets in prepared:
+        job.submission = {
+            schema: json.loads(target.to_json(orient="records"))[0]
+            for schema, target in schema_targets.items()
+        }
+        job.raw_submission = raw_submission
     schema_xmls["submission"] = submission_xml
+    if settings.ENA_XSD_VALIDATION and "run" in schema_xmls:
+        # The XMLs were validated before the upload (see `upload_job`), since
+        # then only the checksums of the run XML changed
+        with timings.stage("xsd_validate"):
+            xsd.check_xmls({"run": schema_xmls["run"]})
 
     url = dynamic_settings.ENA_ENDPOINT()
-    log.info(f"Submitting XMLs to ENA server: {url}")
-    receipt = ena.send_schemas(
-        schema_xmls, url, settings.ENA_USERNAME, settings.ENA_PASSWORD
-    ).text
-    job.raw_result = receipt
-    schema_update = process_receipt(receipt.encode("utf-8"), job.action)
-
-    if job.action in ["ADD", "MODIFY"]:
-        schema_dataframe = ena.update_table(
-            schema_dataframe, schema_targets, schema_update
-        )
-    else:
-        schema_dataframe = ena.update_table_simple(
-            schema_dataframe, schema_targets, job.action
+    log.info(f"Submitting XMLs of {len(prepared)} job(s) to ENA server: {url}")
+    limiter = rate_limiter("submit")
+    limiter.acquire()
+    try:
+        with timings.stage("http_submit") as stats:
+            stats["bytes"] = sum(map(len, schema_xmls.values()))
+            response = send_xmls(schema_xmls, url)
+            stats["info"] = {"status_code": response.status_code}
+    except Exception:
+        limiter.failure()
+        raise
+    if response.status_code == 429 or response.status_code >= 500:
+        limiter.failure()
+        raise ENAUnavailableError(
+            f"ENA responded with HTTP {response.status_code}: {response.text}"
         )
-    job.result = {
-        schema: json.loads(dataframe.to_json(orient="records"))[0]
-        for schema, dataframe in schema_dataframe.items()
-    }
+    receipt = response.text
+    for job, _, _ in prepared:
+        job.raw_result = receipt
+    try:
+        with timings.stage("receipt_parse"):
+            schema_update = process_receipt(receipt.encode("utf-8"), action)
+    except Exception:
+        limiter.failure()
+        raise
+    limiter.success()
+
+    for job, schema_dataframe, schema_targets in prepared:
+        # ENA accepted the submission: a job whose result cannot be stored
+        # must not be failed (and requeued), that would submit it twice
+        try:
+            with timings.focus([job]):
+                store_result(
+                    job, action, schema_update, schema_dataframe, schema_targets
+                )
+        except Exception as ex:
+            log.error(f"Cannot store the result of the submitted job {job}: {ex}")
+
+
+def store_result(
+    job: Job, action: str, schema_update, schema_dataframe, schema_targets
+):
+    """Stores a job of an accepted submission as SUBMITTED with its result.
+
+    The job is saved as SUBMITTED (with the receipt) even if its result cannot
+    be taken from the receipt.
+    """
     job.status = "SUBMITTED"
-    job.save()
+    try:
+        if action in ["ADD", "MODIFY"]:
+            schema_dataframe = ena.update_table(
+                schema_dataframe,
+                schema_targets,
+                split_update(schema_update, schema_targets),
+            )
+        else:
+            schema_dataframe = ena.update_table_simple(
+                schema_dataframe, schema_targets, action
+            )
+        job.result = {
+            schema: json.loads(dataframe.to_json(orient="records"))[0]
+            for schema, dataframe in schema_dataframe.items()
+        }
+    finally:
+        with timings.stage("db_save"):
+            job.save()
+    index_accessions([job])
+
+
+def ena_upload(job: Job):
+    schema_dataframe, schema_targets = prepare_upload(job)
+    upload_job(job, schema_dataframe, schema_targets)
+    submit_upload([(job, schema_dataframe, schema_targets)])
+
+
+def batch_key(job: Job):
+    """Jobs sharing this key can be submitted together."""
+    return (job.action, job.data.get("center_name"), job.data.get("checklist"))
+
+
+def ena_upload_batch(jobs: list):
+    """Submits compatible jobs together in as few submissions as possible.
+
+    Jobs that fail their preparation are left out of the submission. If ENA
+    rejects a combined submission, its jobs are resubmitted one by one, so a
+    single invalid job does not fail the others. Jobs of an accepted
+    submission are never returned as failed.
+
+    Returns a list of (job, exception) tuples of the failed jobs.
+    """
+    failed = []
+    batches = []
+    for job in jobs:
+        try:
+            with timings.focus([job]):
+                schema_dataframe, schema_targets = prepare_upload(job)
+                upload_job(job, schema_dataframe, schema_targets)
+        except Exception as ex:
+            failed.append((job, ex))
+            continue
+        aliases = {
+            (schema, alias)
+            for schema, targets in schema_targets.items()
+            if "alias" in targets
+            for alias in targets["alias"]
+        }
+        # ENA rejects duplicated aliases within a submission
+        for batch in batches:
+            if batch_key(batch["jobs"][0][0]) == batch_key(job) and not (
+                batch["aliases"] & aliases
+            ):
+                break
+        else:
+            batch = {"jobs": [], "aliases": set()}
+            batches.append(batch)
+        batch["jobs"].append((job, schema_dataframe, schema_targets))
+        batch["aliases"] |= aliases
+
+    for batch in batches:
+        try:
+            with timings.focus([job for job, _, _ in batch["jobs"]]):
+                submit_upload(batch["jobs"])
+        except ValidationError as ex:
+            if len(batch["jobs"]) == 1:
+                failed.append((batch["jobs"][0][0], ex))
+                continue
+            log.warning(f"Batch submission rejected, submitting jobs one by one: {ex}")
+            for prepared in batch["jobs"]:
+                try:
+                    with timings.focus([prepared[0]]):
+                        submit_upload([prepared])
+                except Exception as ex:
+                    failed.append((prepared[0], ex))
+        except Exception as ex:
+            failed += [(job, ex) for job, _, _ in batch["jobs"]]
+    return failed
+
+
+def webin_cli():
+    """The webin-cli command (ENA_WEBIN_CLI)."""
+    command, *args = shlex.split(settings.ENA_WEBIN_CLI)
+    return Command(command).bake(*args)
 
 
 def webin_upload(job: AnalysisJob):
-    webin = Command("/usr/bin/java")
-    webin = webin.bake("-jar", "/opt/webin-cli.jar")
+    webin = webin_cli()
+    limiter = rate_limiter("webin")
+    limiter.acquire()
     with tempfile.NamedTemporaryFile(delete=False) as mf:
         mf.write(job.manifest.encode("utf-8"))
         mf.close()
-        try:
-            if config.ENA_USE_DEV_ENDPOINT:
-                out = webin(
-                    "-context",
-                    "genome",
-                    "-username",
-                    settings.ENA_USERNAME,
-                    "-password",
-                    settings.ENA_PASSWORD,
-                    "-manifest",
-                    mf.name,
-                    "-submit",
-                    "-ascp",
-                    "-test",
-                    _err_to_out=True,
-                )
-            else:
-                out = webin(
-                    "-context",
-                    "genome",
-                    "-username",
-                    settings.ENA_USERNAME,
-                    "-password",
-                    settings.ENA_PASSWORD,
-                    "-manifest",
-                    mf.name,
-                    "-submit",
-                    "-ascp",
-                    _err_to_out=True,
+        with timings.stage("webin_cli"):
+            try:
+                if config.ENA_USE_DEV_ENDPOINT:
+                    out = webin(
+                        "-context",
+                        "genome",
+                        "-username",
+                        settings.ENA_USERNAME,
+                        "-password",
+                        settings.ENA_PASSWORD,
+                        "-manifest",
+                        mf.name,
+                        "-submit",
+                        "-ascp",
+                        "-test",
+                        _err_to_out=True,
+                    )
+                else:
+                    out = webin(
+                        "-context",
+                        "genome",
+                        "-username",
+                        settings.ENA_USERNAME,
+                        "-password",
+                        settings.ENA_PASSWORD,
+                        "-manifest",
+                        mf.name,
+                        "-submit",
+                        "-ascp",
+                        _err_to_out=True,
+                    )
+                log.debug(f"Submission output: {out}")
+                accession = re.findall("ERZ[0-9]+", out, flags=re.MULTILINE)
+                log.debug(f"Accessions: {accession}")
+                if len(accession) > 0:
+                    log.debug(f"Found accession: {accession[0]}")
+                    job.result = {"accession": accession[0]}
+                else:
+                    log.debug("No accession found :(")
+                job.raw_result = out
+                job.status = "SUBMITTED"
+                limiter.success()
+            except ErrorReturnCode as e:
+                if isinstance(e, str):
+                    job.raw_result = e
+                else:
+                    job.raw_result = e.stdout + e.stderr
+                job.status = "ERROR"
+                limiter.failure()
+                metrics.inc(
+                    "ena_upload_job_errors_total", model="analysisjob", kind="webin_cli"
                 )
-            log.debug(f"Submission output: {out}")
-            accession = re.findall("ERZ[0-9]+", out, flags=re.MULTILINE)
-            log.debug(f"Accessions: {accession}")
-            if len(accession) > 0:
-                log.debug(f"Found accession: {accession[0]}")
-                job.result = {"accession": accession[0]}
-            else:
-                log.debug("No accession found :(")
-            job.raw_result = out
-            job.status = "SUBMITTED"
-        except ErrorReturnCode as e:
-            if isinstance(e, str):
-                job.raw_result = e
-            else:
-                job.raw_result = e.stdout + e.stderr
-            job.status = "ERROR"
 
-    job.save()
+    with timings.stage("db_save"):
+        job.save()
 
 
 def webin_validate(job: AnalysisJob):
-    webin = Command("/usr/bin/java")
-    webin = webin.bake("-jar", "/opt/webin-cli.jar")
+    """Validates an analysis job with webin-cli, within the webin budget.
+
+    Raises an ENAUnavailableError if the budget does not allow the call within
+    ENA_VALIDATE_WAIT_SECS, the API request is not held any longer.
+    """
+    webin = webin_cli()
+    limiter = rate_limiter("webin")
+    if not limiter.acquire(timeout=settings.ENA_VALIDATE_WAIT_SECS):
+        raise ENAUnavailableError(
+            "Too many calls to ENA (webin-cli), please retry later."
+        )
     with tempfile.NamedTemporaryFile(delete=False) as mf:
         mf.write(job.manifest.encode("utf-8"))
         mf.close()
@@ -367,14 +619,30 @@ def webin_validate(job: AnalysisJob):
                 _err_to_out=True,
             )
             log.debug(f"Validation output: {out}")
+            limiter.success()
             return out
         except ErrorReturnCode as e:
+            limiter.failure()
             if isinstance(e, str):
                 return e
             else:
                 return e.stdout.decode("utf-8") + e.stderr.decode("utf-8")
 
 
+def split_update(schema_update, schema_targets):
+    """Returns the part of a receipt update that belongs to the given targets.
+
+    The rows are matched by alias, which is unique within a submission.
+    """
+    return {
+        schema: update[
+            update["alias"].isin(schema_targets[schema]["alias"])
+        ].reset_index(drop=True)
+        for schema, update in schema_update.items()
+        if schema in schema_targets
+    }
+
+
 def process_receipt(receipt, action):
     receipt_root = etree.fromstring(receipt)
     success = receipt_root.get("success")
@@ -1,8 +1,15 @@
 from drf_auto_endpoint.endpoints import Endpoint
 from drf_auto_endpoint.router import register
 
-from .models import AnalysisFile, AnalysisJob, File, Job
-from .views import AnalysisFileViewset, AnalysisJobViewset, FileViewset, JobViewset
+from .models import Accession, AnalysisFile, AnalysisJob, File, Job
+from .pagination import JobPagination
+from .views import (
+    AccessionViewset,
+    AnalysisFileViewset,
+    AnalysisJobViewset,
+    FileViewset,
+    JobViewset,
+)
 
 
 class DefaultEndpoint(Endpoint):
@@ -22,6 +29,7 @@ class DefaultEndpoint(Endpoint):
 class JobEndpoint(DefaultEndpoint):
     model = Job
     base_viewset = JobViewset
+    base_pagination_class = JobPagination
     # filter_fields = ("status", "action")
 
 
@@ -35,6 +43,7 @@ class FileEndpoint(DefaultEndpoint):
 class AnalysisJobEndpoint(DefaultEndpoint):
     model = AnalysisJob
     base_viewset = AnalysisJobViewset
+    base_pagination_class = JobPagination
     filter_fields = ("status",)
 
 
@@ -42,3 +51,9 @@ class AnalysisJobEndpoint(DefaultEndpoint):
 class AnalysisFileEndpoint(DefaultEndpoint):
     model = AnalysisFile
     base_viewset = AnalysisFileViewset
+
+
+@register
+class AccessionEndpoint(DefaultEndpoint):
+    model = Accession
+    base_viewset = AccessionViewset
@@ -1,6 +1,6 @@
 from django_filters import rest_framework as filters
 
-from .models import Job
+from .models import FILES_TEXT, SAMPLE_SUBMISSION_DATE, Accession, Job
 
 
 class JobFilterSet(filters.FilterSet):
@@ -12,7 +12,20 @@ class JobFilterSet(filters.FilterSet):
     def alias_filter(queryset, name, value):
         return queryset.filter(**{f"submission__{name}__icontains": value})
 
-    files = filters.CharFilter(lookup_expr="icontains")
+    # The searched expressions match the trigram indexes of Job
+    def files_filter(queryset, name, value):
+        return queryset.alias(files_text=FILES_TEXT).filter(files_text__icontains=value)
+
+    def file_filter(queryset, name, value):
+        return queryset.filter(files__contains=[value])
+
+    def submission_date_filter(queryset, name, value):
+        return queryset.alias(submission_date=SAMPLE_SUBMISSION_DATE).filter(
+            submission_date__icontains=value
+        )
+
+    files = filters.CharFilter(label="Files (contains)", method=files_filter)
+    file = filters.CharFilter(label="File (exact path)", method=file_filter)
 
     # Accession filters
     study = filters.CharFilter(label="Study", method=accession_filter)
@@ -28,12 +41,18 @@ class JobFilterSet(filters.FilterSet):
     )
     run__alias = filters.CharFilter(label="Run alias", method=alias_filter)
 
+    # Exact lookups in the accession index
+    accession = filters.CharFilter(
+        label="Accession (exact)", field_name="accessions__accession", distinct=True
+    )
+    alias = filters.CharFilter(
+        label="Alias (exact)", field_name="accessions__alias", distinct=True
+    )
+
     created_at = filters.DateFromToRangeFilter(label="Created at")
     exact_created_at = filters.DateTimeFromToRangeFilter(label="Exact created at")
     sample__submission_date = filters.CharFilter(
-        lookup_expr="icontains",
-        label="Sample submission date (contains)",
-        field_name="result__sample__submission_date",
+        label="Sample submission date (contains)", method=submission_date_filter
     )
 
     class Meta:
@@ -50,8 +69,25 @@ class JobFilterSet(filters.FilterSet):
             "sample__alias",
             "experiment__alias",
             "run__alias",
+            "accession",
+            "alias",
             "files",
+            "file",
             "created_at",
             "exact_created_at",
             "sample__submission_date",
         )
+
+
+class AccessionFilterSet(filters.FilterSet):
+    """Exact and prefix lookups of accessions and aliases"""
+
+    class Meta:
+        model = Accession
+        fields = {
+            "accession": ["exact", "startswith"],
+            "alias": ["exact", "startswith"],
+            "schema": ["exact"],
+            "status": ["exact"],
+            "job": ["exact"],
+        }
@@ -0,0 +1,304 @@
+import ftplib
+import hashlib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from os.path import abspath, getsize
+
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
+from ena_upload import ena_upload as ena
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from core import log
+
+from .checksums import file_signature
+from .models import FTPUpload
+from .ratelimit import rate_limiter
+
+
+class FTPUploadError(APIException):
+    status_code = status.HTTP_400_BAD_REQUEST
+    default_detail = _("File(s) could not be uploaded via FTP.")
+    default_code = "ftp_upload_error"
+
+
+class FTPSessionPool:
+    """Pool of logged in FTPS sessions to the webin server.
+
+    The sessions are shared by all worker threads of the process. Idle
+    sessions are checked with a NOOP before they are reused and replaced by a
+    new session if they were closed by the server.
+    """
+
+    def __init__(self, host: str, port: int, size: int, max_idle_secs: int):
+        self.host = host
+        self.port = port
+        self.max_idle_secs = max_idle_secs
+        self.idle = []
+        self.lock = threading.Lock()
+        self.slots = threading.BoundedSemaphore(size)
+
+    def __connect(self):
+        limiter = rate_limiter("ftp")
+        limiter.acquire()
+        log.info(f"Connecting to {self.host}...")
+        try:
+            ftps = ena.MyFTP_TLS(timeout=120)
+            ftps.context.set_ciphers("HIGH:!DH:!aNULL")
+            ftps.connect(self.host, port=self.port)
+            ftps.auth()
+            ftps.login(settings.ENA_USERNAME, settings.ENA_PASSWORD)
+            ftps.prot_p()
+        except IOError as ioe:
+            log.error("ERROR: could not connect to the ftp server.\
+                   Please check your login details.")
+            log.error(ioe)
+            limiter.failure()
+            raise FTPUploadError(f"Cannot connect to the ftp server {self.host}: {ioe}")
+        limiter.success()
+        return ftps
+
+    @staticmethod
+    def __discard(ftps):
+        try:
+            ftps.close()
+        except Exception:
+            pass
+
+    def __checkout(self):
+        while True:
+            with self.lock:
+                if not self.idle:
+                    break
+                ftps, released_at = self.idle.pop()
+            if time.monotonic() - released_at > self.max_idle_secs:
+                self.__discard(ftps)
+                continue
+            try:
+                ftps.voidcmd("NOOP")
+                return ftps
+            except Exception as ex:
+                log.debug(f"Discarding stale FTP session: {ex}")
+                self.__discard(ftps)
+        return self.__connect()
+
+    @contextmanager
+    def session(self):
+        """Borrows a healthy session. It is closed if the block raises."""
+        with self.slots:
+            ftps = self.__checkout()
+            try:
+                yield ftps
+            except BaseException:
+                self.__discard(ftps)
+                raise
+            with self.lock:
+                self.idle.append((ftps, time.monotonic()))
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def session_pool() -> FTPSessionPool:
+    """The process wide FTPS session pool."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = FTPSessionPool(
+                settings.ENA_FTP_HOST,
+                settings.ENA_FTP_PORT,
+                settings.ENA_FTP_POOL_SIZE,
+                settings.ENA_FTP_IDLE_SECS,
+            )
+        return _pool
+
+
+def remote_size(ftps, filename: str):
+    """Returns the size of an already uploaded file, or None if it is missing."""
+    try:
+        ftps.voidcmd("TYPE I")
+        return ftps.size(filename)
+    except ftplib.error_perm:
+        return None
+
+
+def start_uploads(file_paths: dict):
+    """Records the uploads of the files as started.
+
+    Returns the signatures of the files and the earlier uploads of the
+    unchanged files (same remote name, path, size, mtime and inode) by
+    filename. Only these uploads are resumed or skipped, any other file on
+    the server is overwritten.
+    """
+    signatures = {
+        filename: file_signature(path) for filename, path in file_paths.items()
+    }
+    previous = {
+        upload.path: upload
+        for upload in FTPUpload.objects.filter(
+            path__in=[abspath(path) for path in file_paths.values()]
+        )
+    }
+    recorded = {}
+    for filename, path in file_paths.items():
+        upload = previous.get(abspath(path))
+        if (
+            upload is not None
+            and upload.filename == filename
+            and {key: getattr(upload, key) for key in signatures[filename]}
+            == signatures[filename]
+        ):
+            recorded[filename] = upload
+            continue
+        FTPUpload.objects.update_or_create(
+            path=abspath(path),
+            defaults={"filename": filename, "md5sum": None, **signatures[filename]},
+        )
+    return signatures, recorded
+
+
+def complete_upload(path: str, md5sum: str, signature: dict):
+    """Records a completed upload, if the file did not change meanwhile."""
+    if file_signature(path) != signature:
+        log.warning(f"File {path} changed while uploading, not recording it.")
+        return
+    FTPUpload.objects.filter(path=abspath(path), **signature).update(md5sum=md5sum)
+
+
+def upload_file(
+    ftps,
+    filename: str,
+    path: str,
+    expected_md5: str = None,
+    recorded: FTPUpload = None,
+):
+    """Uploads a file and computes its md5 sum from the streamed bytes.
+
+    The file is read from disk exactly once. If this service `recorded` an
+    upload of the unchanged file, a completed one is skipped if the remote
+    file has the full size, and a partial one is resumed at the remote size.
+    Raises an FTPUploadError if the md5 sum does not match the expected one.
+    """
+    size = getsize(path)
+    if recorded is None:
+        offset = 0
+    else:
+        offset = remote_size(ftps, filename) or 0
+        completed = recorded.md5sum and expected_md5 in [None, recorded.md5sum]
+        if offset == size and completed:
+            log.info(f"Skipping {path}, it is already uploaded.")
+            return recorded.md5sum
+    if offset >= size or not settings.ENA_FTP_RESUME:
+        offset = 0
+
+    md5 = hashlib.md5()
+    with open(path, "rb") as fh:
+        # The already uploaded part is only hashed
+        remaining = offset
+        while remaining > 0:
+            chunk = fh.read(min(remaining, settings.ENA_FTP_BLOCK_SIZE))
+            md5.update(chunk)
+            remaining -= len(chunk)
+        if offset:
+            log.info(f"Resuming upload of {path} at byte {offset}...")
+        try:
+            result = ftps.storbinary(
+                f"STOR {filename}",
+                fh,
+                blocksize=settings.ENA_FTP_BLOCK_SIZE,
+                callback=md5.update,
+                rest=offset or None,
+            )
+        except ftplib.error_perm as err:
+            if not offset:
+                raise
+            log.warning(f"Cannot resume upload of {path}, restarting: {err}")
+            fh.seek(0)
+            md5 = hashlib.md5()
+            result = ftps.storbinary(
+                f"STOR {filename}",
+                fh,
+                blocksize=settings.ENA_FTP_BLOCK_SIZE,
+                callback=md5.update,
+            )
+        log.info(result)
+    md5sum = md5.hexdigest()
+    if expected_md5 and md5sum != expected_md5:
+        raise FTPUploadError(
+            f"Checksum mismatch of uploaded file {path}: expected {expected_md5}, got {md5sum}."
+        )
+    return md5sum
+
+
+def upload_pooled(
+    filename: str, path: str, expected_md5: str = None, recorded: FTPUpload = None
+):
+    """Uploads a file over a session of the pool."""
+    log.info(f"Uploading {path}...")
+    try:
+        with session_pool().session() as ftps:
+            return upload_file(ftps, filename, path, expected_md5, recorded)
+    except FTPUploadError:
+        raise
+    except BaseException as err:
+        log.error(f"ERROR: {err}")
+        log.error(
+            "ERROR: If your connection times out at this stage, it probably is because of a firewall that is in place. FTP is used in passive mode and connection will be opened to one of the ports: 40000 and 50000."
+        )
+        rate_limiter("ftp").failure()
+        raise FTPUploadError(
+            f"Cannot upload file {path} to {settings.ENA_FTP_HOST}: {err}"
+        )
+
+
+def upload_files(file_paths: dict, expected_md5: dict = None):
+    """Uploads files over up to ENA_FTP_PARALLEL_UPLOADS parallel sessions.
+
+    :param file_paths: a dictionary of filename string and file_path string
+    :param expected_md5: an optional dictionary of filename string and the
+        known md5 sum of the file
+    :return: a dictionary of filename string and the md5 sum of the uploaded
+        bytes
+    """
+    expected_md5 = expected_md5 or {}
+    # The uploads are recorded by this thread, the upload threads do not
+    # use the database
+    signatures, recorded = start_uploads(file_paths)
+    parallel = min(settings.ENA_FTP_PARALLEL_UPLOADS, len(file_paths))
+    file_md5 = {}
+    if parallel <= 1:
+        for filename, path in file_paths.items():
+            file_md5[filename] = upload_pooled(
+                filename, path, expected_md5.get(filename), recorded.get(filename)
+            )
+            complete_upload(path, file_md5[filename], signatures[filename])
+        return file_md5
+    with ThreadPoolExecutor(max_workers=parallel, thread_name_prefix="ftp") as pool:
+        futures = {
+            filename: pool.submit(
+                upload_pooled,
+                filename,
+                path,
+                expected_md5.get(filename),
+                recorded.get(filename),
+            )
+            for filename, path in file_paths.items()
+        }
+        error = None
+        for filename, future in futures.items():
+            try:
+                file_md5[filename] = future.result()
+            except Exception as ex:
+                error = error or ex
+                continue
+            # The completed uploads are recorded even if others failed
+            complete_upload(
+                file_paths[filename], file_md5[filename], signatures[filename]
+            )
+        if error is not None:
+            raise error
+        return file_md5
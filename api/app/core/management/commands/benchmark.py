@@ -0,0 +1,83 @@
+import json
+
+from core.benchmarks import CASES, SIZES, compare, metadata, run_benchmarks
+from core.models import Job
+from django.core.management.base import BaseCommand, CommandError
+from django.db import router, transaction
+
+
+def csv_list(value: str):
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+class Command(BaseCommand):
+    help = "Benchmarks the submission hot path and stores the results as JSON"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--cases",
+            type=csv_list,
+            default=list(CASES),
+            help=f"Comma separated cases (default: {','.join(CASES)})",
+        )
+        parser.add_argument(
+            "--sizes",
+            type=lambda value: [int(size) for size in csv_list(value)],
+            default=SIZES,
+            help="Comma separated rows/attributes per schema (default: 1,...,10000)",
+        )
+        parser.add_argument(
+            "--min-time",
+            type=float,
+            default=1.0,
+            help="Minimal seconds to run each case and size",
+        )
+        parser.add_argument(
+            "--max-runs", type=int, default=1000, help="Maximal runs of each case"
+        )
+        parser.add_argument("--output", help="Store the results in this JSON file")
+        parser.add_argument(
+            "--compare", help="Compare the results with the ones in this JSON file"
+        )
+
+    def handle(self, *args, **options):
+        unknown = set(options["cases"]) - set(CASES)
+        if unknown:
+            raise CommandError(f"Unknown cases: {', '.join(sorted(unknown))}")
+
+        results = []
+        # The manifest case stores jobs, nothing is kept
+        with transaction.atomic(using=router.db_for_write(Job)):
+            for result in run_benchmarks(
+                options["cases"],
+                options["sizes"],
+                options["min_time"],
+                options["max_runs"],
+            ):
+                results.append(result)
+                self.stdout.write(
+                    f"{result['name']:<16} {result['size']:>6} "
+                    f"{result['ops_per_sec']:>12.2f} ops/s "
+                    f"{result['peak_memory_bytes'] / 1024:>12.1f} KiB"
+                )
+            transaction.set_rollback(True, using=router.db_for_write(Job))
+
+        if options["output"]:
+            with open(options["output"], "w") as of:
+                json.dump({"meta": metadata(), "results": results}, of, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Stored {options['output']}"))
+
+        if options["compare"]:
+            with open(options["compare"], "r") as cf:
+                baseline = json.load(cf)["results"]
+            for name, size, old, new, ratio in compare(results, baseline):
+                line = (
+                    f"{name:<16} {size:>6} {old:>12.2f} -> {new:>12.2f} ops/s "
+                    f"{ratio:>6.2f}x"
+                )
+                if ratio < 0.9:
+                    self.stdout.write(self.style.ERROR(line))
+                elif ratio > 1.1:
+                    self.stdout.write(self.style.SUCCESS(line))
+                else:
+                    self.stdout.write(line)
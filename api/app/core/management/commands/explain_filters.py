@@ -0,0 +1,58 @@
+from core.filters import JobFilterSet
+from core.models import Job
+from django.core.exceptions import FieldError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError
+from django_filters import rest_framework as filters
+
+
+def example_params(name: str, field, value: str) -> dict:
+    """Query parameters that apply the filter `name`."""
+    if isinstance(
+        field, (filters.DateFromToRangeFilter, filters.DateTimeFromToRangeFilter)
+    ):
+        return {f"{name}_after": "2024-01-01"}
+    if isinstance(field, filters.ChoiceFilter):
+        return {name: field.extra["choices"][0][0]}
+    return {name: value}
+
+
+class Command(BaseCommand):
+    help = "Prints the EXPLAIN plans of the job filters"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "filters",
+            nargs="*",
+            help="The filters to explain (default: all)",
+        )
+        parser.add_argument(
+            "--value", default="ERS", help="The value of the text filters"
+        )
+        parser.add_argument(
+            "--analyze",
+            action="store_true",
+            help="Run the queries (EXPLAIN ANALYZE)",
+        )
+
+    def handle(self, *args, **options):
+        base_filters = JobFilterSet.base_filters
+        names = options["filters"] or list(base_filters)
+        unknown = set(names) - set(base_filters)
+        if unknown:
+            raise CommandError(f"Unknown filters: {', '.join(sorted(unknown))}")
+
+        for name in names:
+            params = example_params(name, base_filters[name], options["value"])
+            filterset = JobFilterSet(params, queryset=Job.objects.all())
+            self.stdout.write(self.style.MIGRATE_HEADING(f"{name}: {params}"))
+            if not filterset.is_valid():
+                self.stdout.write(self.style.ERROR(str(filterset.errors)))
+                continue
+            try:
+                plan = filterset.qs.explain(analyze=options["analyze"])
+            except (DatabaseError, FieldError) as ex:
+                self.stdout.write(self.style.ERROR(str(ex)))
+                continue
+            self.stdout.write(plan)
+            self.stdout.write("")
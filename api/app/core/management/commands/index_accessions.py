@@ -0,0 +1,29 @@
+from core.accessions import index_accessions
+from core.models import Job
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = "Indexes the accessions of the submitted jobs (backfill)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size", type=int, default=500, help="Jobs indexed at once"
+        )
+
+    def handle(self, *args, **options):
+        jobs = (
+            Job.objects.filter(status="SUBMITTED", result__isnull=False)
+            .only("id", "result")
+            .order_by("id")
+        )
+        batch = []
+        indexed = 0
+        for job in jobs.iterator(chunk_size=options["batch_size"]):
+            batch.append(job)
+            if len(batch) >= options["batch_size"]:
+                indexed += index_accessions(batch)
+                batch = []
+        if batch:
+            indexed += index_accessions(batch)
+        self.stdout.write(self.style.SUCCESS(f"Indexed {indexed} accessions"))
@@ -0,0 +1,71 @@
+from core.models import Taxon
+from django.core.management.base import BaseCommand
+from django.utils import timezone as tz
+
+
+def read_dmp(file):
+    """Yields the fields of the lines of an NCBI taxonomy dump file."""
+    with open(file, "r") as df:
+        for line in df:
+            yield [field.strip() for field in line.rstrip("\t|\n").split("\t|\t")]
+
+
+class Command(BaseCommand):
+    help = (
+        "Seeds the taxonomy cache from an NCBI taxonomy dump (taxdump), "
+        "the loaded entries do not expire"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("names", help="Path to the names.dmp file")
+        parser.add_argument(
+            "--nodes", help="Path to the nodes.dmp file, required for --ranks"
+        )
+        parser.add_argument(
+            "--ranks",
+            help="Comma separated list of ranks to load, e.g. species,subspecies",
+        )
+        parser.add_argument("--batch-size", type=int, default=10000)
+
+    def handle(self, *args, **options):
+        taxon_ids = None
+        if options["ranks"]:
+            if not options["nodes"]:
+                self.stderr.write(self.style.ERROR("--ranks requires --nodes"))
+                return
+            ranks = set(options["ranks"].split(","))
+            taxon_ids = {
+                fields[0] for fields in read_dmp(options["nodes"]) if fields[2] in ranks
+            }
+
+        now = tz.now()
+        batch = []
+        loaded = 0
+        for fields in read_dmp(options["names"]):
+            taxon_id, name, _, name_class = fields[:4]
+            if name_class != "scientific name":
+                continue
+            if taxon_ids is not None and taxon_id not in taxon_ids:
+                continue
+            batch.append(
+                Taxon(
+                    taxon_id=taxon_id,
+                    scientific_name=name,
+                    source="DUMP",
+                    updated_at=now,
+                )
+            )
+            if len(batch) >= options["batch_size"]:
+                loaded += self.save(batch)
+                batch = []
+        loaded += self.save(batch)
+        self.stdout.write(self.style.SUCCESS(f"Loaded {loaded} taxa"))
+
+    def save(self, batch):
+        Taxon.objects.bulk_create(
+            batch,
+            update_conflicts=True,
+            unique_fields=["taxon_id"],
+            update_fields=["scientific_name", "source", "updated_at"],
+        )
+        return len(batch)
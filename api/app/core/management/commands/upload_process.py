@@ -1,59 +1,28 @@
-import time
-
-from constance import config
 from core import log
-from core.ena_helpers import ena_upload, webin_upload
-from core.models import AnalysisJob, Job
+from core.worker import run_workers
 from django.conf import settings
 from django.core.management.base import BaseCommand
 
 
 class Command(BaseCommand):
-    def handle(self, *args, **options):
-        while True:
-            log.debug(
-                f"{'[DEV] ' if config.ENA_USE_DEV_ENDPOINT else ''}Handling queued jobs..."
-            )
-            queued_jobs = Job.objects.filter(status="QUEUED")
-            for queued_job in queued_jobs:
-                log.info(f"Handling queued job {queued_job}...")
-                try:
-                    queued_job.status = "RUNNING"
-                    queued_job.save()
-                    ena_upload(queued_job)
-                except Exception as ex:
-                    queued_job.status = "ERROR"
-                    queued_job.raw_result = ex
-                    queued_job.save()
-                    log.exception(ex)
-                    log.exception(ex.__traceback__)
-                finally:
-                    time.sleep(settings.ENA_UPLOAD_THROTTLE_SECS)
+    help = "Processes the queued jobs and analysis jobs"
 
-            queued_analysisjobs = AnalysisJob.objects.filter(status="QUEUED")
-            for queued_analysisjob in queued_analysisjobs:
-                log.info(f"Handling queued analysis job {queued_analysisjob}...")
-                try:
-                    if queued_analysisjob.analysisjob_files.count() > 0:
-                        queued_analysisjob.status = "RUNNING"
-                        queued_analysisjob.save()
-                        webin_upload(queued_analysisjob)
-                    else:
-                        log.warning(
-                            f"Analysis job {queued_analysisjob} has no assigned files!"
-                        )
-                        queued_analysisjob.status = "ERROR"
-                        queued_analysisjob.raw_result = (
-                            "Analysis job has no assigned files!"
-                        )
-                        queued_analysisjob.save()
-                except Exception as ex:
-                    queued_analysisjob.status = "ERROR"
-                    queued_analysisjob.raw_result = ex
-                    queued_analysisjob.save()
-                    log.exception(ex)
-                    log.exception(ex.__traceback__)
-                finally:
-                    time.sleep(settings.ENA_UPLOAD_THROTTLE_SECS)
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=settings.ENA_UPLOAD_WORKERS,
+            help="Number of concurrent workers in this process",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=settings.ENA_UPLOAD_BATCH_SIZE,
+            help="Maximum number of compatible jobs combined into one submission",
+        )
 
-            time.sleep(settings.ENA_UPLOAD_FREQ_SECS)
+    def handle(self, *args, **options):
+        workers = max(1, options["workers"])
+        batch_size = max(1, options["batch_size"])
+        log.info(f"Starting {workers} upload worker(s) (batch size {batch_size})...")
+        run_workers(workers, batch_size)
@@ -0,0 +1,47 @@
+from os.path import abspath, isfile
+
+from core.checksums import get_md5s
+from core.models import FileChecksum
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = "Rehashes files and updates their cached md5 sums"
+
+    def add_arguments(self, parser):
+        parser.add_argument("paths", nargs="*", help="The files to verify")
+        parser.add_argument(
+            "--all", action="store_true", help="Verify all cached files"
+        )
+        parser.add_argument(
+            "--purge",
+            action="store_true",
+            help="Remove cache entries of files that do not exist anymore",
+        )
+
+    def handle(self, *args, **options):
+        paths = [abspath(path) for path in options["paths"]]
+        if options["all"]:
+            paths += list(FileChecksum.objects.values_list("path", flat=True))
+        existing = []
+        for path in dict.fromkeys(paths):
+            if isfile(path):
+                existing.append(path)
+            elif options["purge"]:
+                FileChecksum.objects.filter(path=path).delete()
+                self.stdout.write(f"Purged {path}")
+            else:
+                self.stdout.write(self.style.WARNING(f"Missing file {path}"))
+        cached = dict(
+            FileChecksum.objects.filter(path__in=existing).values_list("path", "md5sum")
+        )
+        # The files are hashed concurrently (ENA_HASH_WORKERS)
+        for path, md5sum in get_md5s(existing, force=True).items():
+            if cached.get(path) and cached[path] != md5sum:
+                self.stdout.write(
+                    self.style.ERROR(
+                        f"Checksum changed {path}: {cached[path]} -> {md5sum}"
+                    )
+                )
+            else:
+                self.stdout.write(self.style.SUCCESS(f"{md5sum}  {path}"))
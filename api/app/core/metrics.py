@@ -0,0 +1,201 @@
+import bisect
+import re
+import threading
+from collections import defaultdict
+
+from django.db import connections, router, transaction
+from django.db.models import Count
+
+from core import log
+
+from .models import AnalysisJob, Job, Metric
+
+# Name, type and help of the exposed metric families
+FAMILIES = {
+    "ena_upload_queue_depth": (
+        "gauge",
+        "Jobs waiting in or taken from the queue, by model and status.",
+    ),
+    "ena_upload_job_runs_total": (
+        "counter",
+        "Finished job runs, by model, kind and resulting status.",
+    ),
+    "ena_upload_job_errors_total": (
+        "counter",
+        "Failed jobs, by model and kind of error.",
+    ),
+    "ena_upload_stage_seconds": (
+        "histogram",
+        "Duration of the job stages (e.g. http_submit, ftp, webin_cli).",
+    ),
+    "ena_upload_ftp_bytes_per_second": (
+        "histogram",
+        "Throughput of the FTP uploads of a job.",
+    ),
+    "ena_upload_ftp_bytes_total": ("counter", "Bytes uploaded to the FTP server."),
+    "ena_upload_http_requests_total": (
+        "counter",
+        "HTTP requests to ENA, by endpoint (submit, taxonomy).",
+    ),
+    "ena_upload_http_errors_total": (
+        "counter",
+        "HTTP requests to ENA without a response or with a server error.",
+    ),
+    "ena_upload_http_request_seconds": (
+        "histogram",
+        "Duration of the HTTP requests to ENA, by endpoint.",
+    ),
+}
+BUCKETS = {
+    "ena_upload_stage_seconds": (
+        0.01,
+        0.05,
+        0.1,
+        0.25,
+        0.5,
+        1,
+        2.5,
+        5,
+        10,
+        30,
+        60,
+        300,
+        900,
+        3600,
+    ),
+    "ena_upload_ftp_bytes_per_second": tuple(4**power for power in range(8, 16)),
+    "ena_upload_http_request_seconds": (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+}
+QUEUE_STATUSES = ["QUEUED", "RUNNING"]
+LE_PATTERN = re.compile(r'le="([^"]+)",?')
+
+
+def format_labels(**labels) -> str:
+    return ",".join(f'{key}="{value}"' for key, value in sorted(labels.items()))
+
+
+class MetricsBuffer:
+    """Collects the metrics of this process in memory until they are flushed.
+
+    Flushing adds the collected values to the shared `Metric` rows with a
+    single upsert, so the metrics of all worker processes add up.
+    """
+
+    def __init__(self):
+        self.values = defaultdict(float)
+        self.lock = threading.Lock()
+
+    def inc(self, name: str, amount: float = 1, **labels):
+        with self.lock:
+            self.values[(name, format_labels(**labels))] += amount
+
+    def observe(self, name: str, value: float, **labels):
+        """Adds the value to the (cumulative) buckets of a histogram."""
+        buckets = BUCKETS[name]
+        with self.lock:
+            for bound in buckets[bisect.bisect_left(buckets, value) :]:
+                self.values[(f"{name}_bucket", format_labels(le=bound, **labels))] += 1
+            self.values[(f"{name}_bucket", format_labels(le="+Inf", **labels))] += 1
+            self.values[(f"{name}_sum", format_labels(**labels))] += value
+            self.values[(f"{name}_count", format_labels(**labels))] += 1
+
+    def flush(self):
+        with self.lock:
+            values, self.values = self.values, defaultdict(float)
+        if not values:
+            return
+        db = router.db_for_write(Metric)
+        table = Metric._meta.db_table
+        # Sorted by (name, labels), so that concurrent upserts of overlapping
+        # rows lock them in the same order and cannot deadlock
+        items = sorted(values.items())
+        rows = ", ".join(["(%s, %s, %s)"] * len(items))
+        params = [item for key, value in items for item in (*key, value)]
+        try:
+            with connections[db].cursor() as cursor:
+                cursor.execute(
+                    f"INSERT INTO {table} (name, labels, value) VALUES {rows} "
+                    f"ON CONFLICT (name, labels) "
+                    f"DO UPDATE SET value = {table}.value + EXCLUDED.value",
+                    params,
+                )
+        except Exception as ex:
+            log.warning(f"Cannot store the metrics, keeping them for later: {ex}")
+            with self.lock:
+                for key, value in values.items():
+                    self.values[key] += value
+
+
+_buffer = MetricsBuffer()
+
+
+def inc(name: str, amount: float = 1, **labels):
+    _buffer.inc(name, amount, **labels)
+
+
+def observe(name: str, value: float, **labels):
+    _buffer.observe(name, value, **labels)
+
+
+def flush():
+    """Stores the collected metrics once the current transaction is committed
+    (right away outside of a transaction), so a failed upsert cannot break it.
+    """
+    transaction.on_commit(_buffer.flush, using=router.db_for_write(Metric))
+
+
+def queue_depth():
+    """Counts the queued and running jobs, using the partial queue indexes.
+
+    The finished jobs are not counted, their rate is given by the runs.
+    """
+    depth = {}
+    for model in [Job, AnalysisJob]:
+        counts = dict(
+            model.objects.filter(status__in=QUEUE_STATUSES)
+            .order_by()
+            .values_list("status")
+            .annotate(count=Count("id"))
+        )
+        for status in QUEUE_STATUSES:
+            depth[(model._meta.model_name, status)] = counts.get(status, 0)
+    return depth
+
+
+def _sort_key(metric: Metric):
+    """Orders the buckets of a histogram by their bound."""
+    match = LE_PATTERN.search(metric.labels)
+    bound = float(match.group(1)) if match else 0
+    return metric.name, LE_PATTERN.sub("", metric.labels), bound
+
+
+def _family(name: str) -> str:
+    for suffix in ["_bucket", "_sum", "_count"]:
+        if name.endswith(suffix) and name[: -len(suffix)] in BUCKETS:
+            return name[: -len(suffix)]
+    return name
+
+
+def _sample(name: str, labels: str, value) -> str:
+    return f"{name}{{{labels}}} {value}" if labels else f"{name} {value}"
+
+
+def render() -> str:
+    """All metrics in the Prometheus text format."""
+    # The metrics of this process (e.g. of its ENA requests) are shown too
+    flush()
+    stored = defaultdict(list)
+    for metric in sorted(Metric.objects.all(), key=_sort_key):
+        stored[_family(metric.name)].append(metric)
+
+    lines = []
+    for name, (kind, description) in FAMILIES.items():
+        lines.append(f"# HELP {name} {description}")
+        lines.append(f"# TYPE {name} {kind}")
+        if name == "ena_upload_queue_depth":
+            for (model, status), count in queue_depth().items():
+                labels = format_labels(model=model, status=status)
+                lines.append(_sample(name, labels, count))
+        for metric in stored[name]:
+            lines.append(_sample(metric.name, metric.labels, metric.value))
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-17 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='analysisjob',
+            name='status',
+            field=models.CharField(choices=[('DRAFT', 'DRAFT'), ('QUEUED', 'QUEUED'), ('SUBMITTED', 'SUBMITTED'), ('RUNNING', 'RUNNING'), ('ERROR', 'ERROR')], default='DRAFT', max_length=20),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.4 on 2026-10-17 10:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_alter_analysisjob_status'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FileChecksum',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('path', models.CharField(max_length=1024, unique=True)),
+                ('size', models.BigIntegerField()),
+                ('mtime_ns', models.BigIntegerField()),
+                ('inode', models.BigIntegerField()),
+                ('md5sum', models.CharField(max_length=32)),
+                ('verified_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
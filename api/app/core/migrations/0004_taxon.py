@@ -0,0 +1,22 @@
+# Generated by Django 5.2.4 on 2026-10-17 11:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_filechecksum'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Taxon',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('taxon_id', models.CharField(max_length=20, unique=True)),
+                ('scientific_name', models.CharField(db_index=True, max_length=255)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.4 on 2026-10-17 14:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_taxon'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='analysisjob',
+            name='queued_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='job',
+            name='queued_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='JobRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('CREATE', 'CREATE'), ('SUBMIT', 'SUBMIT'), ('WEBIN', 'WEBIN')], max_length=20)),
+                ('status', models.CharField(max_length=20)),
+                ('batch_size', models.IntegerField(default=1)),
+                ('queued_at', models.DateTimeField(blank=True, null=True)),
+                ('started_at', models.DateTimeField()),
+                ('finished_at', models.DateTimeField()),
+                ('analysis_job', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='runs', to='core.analysisjob')),
+                ('job', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='runs', to='core.job')),
+            ],
+            options={
+                'ordering': ('-started_at',),
+            },
+        ),
+        migrations.CreateModel(
+            name='JobEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('stage', models.CharField(choices=[('template', 'template'), ('checklist', 'checklist'), ('dataframe', 'dataframe'), ('md5', 'md5'), ('ftp', 'ftp'), ('taxonomy', 'taxonomy'), ('xml_build', 'xml_build'), ('xsd_validate', 'xsd_validate'), ('http_submit', 'http_submit'), ('receipt_parse', 'receipt_parse'), ('db_save', 'db_save'), ('webin_cli', 'webin_cli')], max_length=20)),
+                ('started_at', models.DateTimeField()),
+                ('seconds', models.FloatField()),
+                ('bytes', models.BigIntegerField(blank=True, null=True)),
+                ('info', models.JSONField(blank=True, null=True)),
+                ('run', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='events', to='core.jobrun')),
+            ],
+            options={
+                'ordering': ('started_at', 'id'),
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.4 on 2026-10-17 15:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_jobrun_jobevent'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Metric',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('labels', models.CharField(blank=True, default='', max_length=255)),
+                ('value', models.FloatField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('name', 'labels'), name='core_metric_name_labels_uniq')],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='analysisjob',
+            index=models.Index(condition=models.Q(('status__in', ['QUEUED', 'RUNNING'])), fields=['status', 'id'], name='core_analysisjob_queue_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='job',
+            index=models.Index(condition=models.Q(('status__in', ['QUEUED', 'RUNNING'])), fields=['status', 'id'], name='core_job_queue_idx'),
+        ),
+    ]
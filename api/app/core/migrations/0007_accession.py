@@ -0,0 +1,30 @@
+# Generated by Django 5.2.4 on 2026-10-17 16:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_metric_job_queue_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Accession',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('schema', models.CharField(max_length=20)),
+                ('alias', models.CharField(blank=True, max_length=255, null=True)),
+                ('accession', models.CharField(blank=True, max_length=50, null=True)),
+                ('status', models.CharField(blank=True, max_length=20, null=True)),
+                ('submission_date', models.CharField(blank=True, max_length=50, null=True)),
+                ('job', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='accessions', to='core.job')),
+            ],
+            options={
+                'ordering': ('-job_id', 'schema'),
+                'indexes': [models.Index(fields=['accession'], name='core_accession_accession_idx', opclasses=['varchar_pattern_ops']), models.Index(fields=['alias'], name='core_accession_alias_idx', opclasses=['varchar_pattern_ops'])],
+            },
+        ),
+    ]
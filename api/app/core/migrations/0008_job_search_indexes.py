@@ -0,0 +1,38 @@
+# Generated by Django 5.2.4 on 2026-10-17 16:48
+
+import core.models
+import django.contrib.postgres.indexes
+import django.db.models.fields.json
+import django.db.models.functions.text
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_accession'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        # array_to_string() is only stable, but immutable for varchar arrays
+        migrations.RunSQL(
+            sql="CREATE FUNCTION core_job_files_text(varchar[]) RETURNS text "
+            "AS $$ SELECT array_to_string($1, ' ') $$ "
+            "LANGUAGE sql IMMUTABLE PARALLEL SAFE",
+            reverse_sql="DROP FUNCTION core_job_files_text(varchar[])",
+        ),
+        migrations.AddIndex(
+            model_name='job',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['files'], name='core_job_files_gin'),
+        ),
+        migrations.AddIndex(
+            model_name='job',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper(core.models.FilesText('files')), name='gin_trgm_ops'), name='core_job_files_trgm'),
+        ),
+        migrations.AddIndex(
+            model_name='job',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper(django.db.models.fields.json.KeyTextTransform('submission_date', django.db.models.fields.json.KeyTextTransform('sample', 'result'))), name='gin_trgm_ops'), name='core_job_sample_date_trgm'),
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.4 on 2026-10-17 17:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_job_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='analysisjob',
+            options={'ordering': ('-created', '-id')},
+        ),
+        migrations.AlterModelOptions(
+            name='job',
+            options={'ordering': ('-created', '-id')},
+        ),
+        migrations.AddField(
+            model_name='analysisjob',
+            name='created',
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.AddField(
+            model_name='job',
+            name='created',
+            field=models.DateTimeField(null=True),
+        ),
+        # The last modification is the best guess for the existing jobs
+        migrations.RunSQL(
+            sql="UPDATE core_analysisjob SET created = created_at",
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.RunSQL(
+            sql="UPDATE core_job SET created = created_at",
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.AlterField(
+            model_name='analysisjob',
+            name='created',
+            field=models.DateTimeField(auto_now_add=True),
+        ),
+        migrations.AlterField(
+            model_name='job',
+            name='created',
+            field=models.DateTimeField(auto_now_add=True),
+        ),
+        migrations.AddIndex(
+            model_name='analysisjob',
+            index=models.Index(fields=['-created', '-id'], name='core_analysisjob_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='job',
+            index=models.Index(fields=['-created', '-id'], name='core_job_created_idx'),
+        ),
+    ]
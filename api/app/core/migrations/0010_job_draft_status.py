@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-17 17:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_job_created'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='job',
+            name='status',
+            field=models.CharField(choices=[('DRAFT', 'DRAFT'), ('QUEUED', 'QUEUED'), ('SUBMITTED', 'SUBMITTED'), ('RUNNING', 'RUNNING'), ('ERROR', 'ERROR')], default='QUEUED', max_length=20),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-17 18:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_job_draft_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='taxon',
+            name='source',
+            field=models.CharField(choices=[('ENA', 'ENA'), ('DUMP', 'DUMP')], default='ENA', max_length=10),
+        ),
+    ]
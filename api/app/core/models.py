@@ -3,20 +3,40 @@ from traceback import print_exc
 
 from django.contrib.auth import get_user_model
 from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex, OpClass
 from django.db import models
+from django.db.models.fields.json import KT
+from django.db.models.functions import Upper
 from ena_upload_ms.dynamic_settings import dynamic_settings
 
 from .helpers import merge
 
 
+class FilesText(models.Func):
+    """The file names of a job as one text (an immutable SQL function, created
+    by migration 0008), so they can be indexed for substring searches."""
+
+    function = "core_job_files_text"
+    output_field = models.TextField()
+
+
+# Searched by the filters of `core.filters` with `icontains`, which compares
+# the UPPER() of the expressions like the trigram indexes of `Job`
+FILES_TEXT = FilesText("files")
+SAMPLE_SUBMISSION_DATE = KT("result__sample__submission_date")
+
+
 class Job(models.Model):
     created_at = models.DateTimeField(auto_now=True)
+    # Set once, the stable order of the (cursor) pagination
+    created = models.DateTimeField(auto_now_add=True)
     owner = models.ForeignKey(
         to=get_user_model(), null=True, on_delete=models.DO_NOTHING, db_constraint=False
     )
     status = models.CharField(
         max_length=20,
         choices=(
+            ("DRAFT", "DRAFT"),
             ("QUEUED", "QUEUED"),
             ("SUBMITTED", "SUBMITTED"),
             ("RUNNING", "RUNNING"),
@@ -62,36 +82,51 @@ class Job(models.Model):
     parent = models.ForeignKey(
         to="Job", on_delete=models.SET_NULL, null=True, related_name="children"
     )
+    # When the job was (re)queued the last time
+    queued_at = models.DateTimeField(null=True, blank=True)
+    # When a worker claimed the job, a RUNNING job whose lease expired (its
+    # worker crashed) is claimed again
+    claimed_at = models.DateTimeField(null=True, blank=True)
 
     @property
     def links(self):
+        return self.links_for(dynamic_settings.ENA_BROWSER_URL())
+
+    def links_for(self, browser_url: str):
+        """The links of the accessions to the given ENA browser."""
         if not self.result:
             return {}
         return {
-            "experiment": (
-                f"{dynamic_settings.ENA_BROWSER_URL()}/{self.result['experiment']['accession']}"
-                if "experiment" in self.result
-                else ""
-            ),
-            "sample": (
-                f"{dynamic_settings.ENA_BROWSER_URL()}/{self.result['sample']['accession']}"
-                if "sample" in self.result
-                else ""
-            ),
-            "run": (
-                f"{dynamic_settings.ENA_BROWSER_URL()}/{self.result['run']['accession']}"
-                if "run" in self.result
+            schema: (
+                f"{browser_url}/{self.result[schema]['accession']}"
+                if schema in self.result
                 else ""
-            ),
-            "study": (
-                f"{dynamic_settings.ENA_BROWSER_URL()}/{self.result['study']['accession']}"
-                if "study" in self.result
-                else ""
-            ),
+            )
+            for schema in ["experiment", "sample", "run", "study"]
         }
 
     class Meta:
-        ordering = ("-created_at",)
+        ordering = ("-created", "-id")
+        indexes = [
+            # The queue (claimed by the workers, counted by the metrics)
+            models.Index(
+                fields=["status", "id"],
+                condition=models.Q(status__in=["QUEUED", "RUNNING"]),
+                name="core_job_queue_idx",
+            ),
+            models.Index(fields=["-created", "-id"], name="core_job_created_idx"),
+            # Exact file names (`files @> ARRAY[...]`)
+            GinIndex(fields=["files"], name="core_job_files_gin"),
+            # Substring (icontains) searches with pg_trgm
+            GinIndex(
+                OpClass(Upper(FILES_TEXT), name="gin_trgm_ops"),
+                name="core_job_files_trgm",
+            ),
+            GinIndex(
+                OpClass(Upper(SAMPLE_SUBMISSION_DATE), name="gin_trgm_ops"),
+                name="core_job_sample_date_trgm",
+            ),
+        ]
 
     def __str__(self):
         return f"Job: {self.id}"
@@ -143,8 +178,60 @@ class File(models.Model):
     md5sum = models.CharField(max_length=32)
 
 
+class FileChecksum(models.Model):
+    """Cached md5 sum of a file, valid as long as the file stays unchanged."""
+
+    path = models.CharField(max_length=1024, unique=True)
+    size = models.BigIntegerField()
+    mtime_ns = models.BigIntegerField()
+    inode = models.BigIntegerField()
+    md5sum = models.CharField(max_length=32)
+    verified_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.path}: {self.md5sum}"
+
+
+class FTPUpload(models.Model):
+    """An upload of a file to the FTP server by this service, see `core.ftp`.
+
+    Only an upload of the unchanged file (same path, size, mtime and inode)
+    is resumed or skipped.
+    """
+
+    path = models.CharField(max_length=1024, unique=True)
+    # The name of the file on the server
+    filename = models.CharField(max_length=255)
+    size = models.BigIntegerField()
+    mtime_ns = models.BigIntegerField()
+    inode = models.BigIntegerField()
+    # Set once the upload completed
+    md5sum = models.CharField(max_length=32, null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.path}: {self.md5sum or 'partial'}"
+
+
+class Taxon(models.Model):
+    """Cached taxonomy entry, looked up at ENA or loaded from an NCBI dump."""
+
+    taxon_id = models.CharField(max_length=20, unique=True)
+    scientific_name = models.CharField(max_length=255, db_index=True)
+    # Entries loaded from a dump (`load_taxonomy`) do not expire
+    source = models.CharField(
+        max_length=10, choices=(("ENA", "ENA"), ("DUMP", "DUMP")), default="ENA"
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.taxon_id}: {self.scientific_name}"
+
+
 class AnalysisJob(models.Model):
     created_at = models.DateTimeField(auto_now=True)
+    # Set once, the stable order of the (cursor) pagination
+    created = models.DateTimeField(auto_now_add=True)
     owner = models.ForeignKey(
         to=get_user_model(), null=True, on_delete=models.DO_NOTHING, db_constraint=False
     )
@@ -157,6 +244,7 @@ class AnalysisJob(models.Model):
             ("DRAFT", "DRAFT"),
             ("QUEUED", "QUEUED"),
             ("SUBMITTED", "SUBMITTED"),
+            ("RUNNING", "RUNNING"),
             ("ERROR", "ERROR"),
         ),
         default="DRAFT",
@@ -167,6 +255,11 @@ class AnalysisJob(models.Model):
     data = models.JSONField(null=False, default=dict)
     result = models.JSONField(null=True, blank=True)
     raw_result = models.TextField(null=True, blank=True)
+    # When the job was (re)queued the last time
+    queued_at = models.DateTimeField(null=True, blank=True)
+    # When a worker claimed the job, a RUNNING job whose lease expired (its
+    # worker crashed) is claimed again
+    claimed_at = models.DateTimeField(null=True, blank=True)
 
     @property
     def manifest(self):
@@ -200,7 +293,18 @@ class AnalysisJob(models.Model):
         return manifest_text
 
     class Meta:
-        ordering = ("-created_at",)
+        ordering = ("-created", "-id")
+        indexes = [
+            # The queue (claimed by the workers, counted by the metrics)
+            models.Index(
+                fields=["status", "id"],
+                condition=models.Q(status__in=["QUEUED", "RUNNING"]),
+                name="core_analysisjob_queue_idx",
+            ),
+            models.Index(
+                fields=["-created", "-id"], name="core_analysisjob_created_idx"
+            ),
+        ]
 
     def __str__(self):
         return f"AnalysisJob: {self.id}"
@@ -233,3 +337,135 @@ class AnalysisFile(models.Model):
 
     def __str__(self):
         return self.file_name
+
+
+class JobRun(models.Model):
+    """One processing of a job (or analysis job) with its timing breakdown."""
+
+    job = models.ForeignKey(
+        to=Job, null=True, on_delete=models.CASCADE, related_name="runs"
+    )
+    analysis_job = models.ForeignKey(
+        to=AnalysisJob, null=True, on_delete=models.CASCADE, related_name="runs"
+    )
+    kind = models.CharField(
+        max_length=20,
+        choices=(
+            ("CREATE", "CREATE"),
+            ("SUBMIT", "SUBMIT"),
+            ("WEBIN", "WEBIN"),
+        ),
+    )
+    status = models.CharField(max_length=20)
+    # The number of jobs submitted together
+    batch_size = models.IntegerField(default=1)
+    queued_at = models.DateTimeField(null=True, blank=True)
+    started_at = models.DateTimeField()
+    finished_at = models.DateTimeField()
+
+    @property
+    def wait_seconds(self):
+        """The time the job waited in the queue."""
+        if self.queued_at is None:
+            return None
+        return max((self.started_at - self.queued_at).total_seconds(), 0)
+
+    @property
+    def run_seconds(self):
+        return (self.finished_at - self.started_at).total_seconds()
+
+    class Meta:
+        ordering = ("-started_at",)
+
+    def __str__(self):
+        return f"JobRun: {self.id} ({self.kind})"
+
+
+class JobEvent(models.Model):
+    """A timed stage of a job run."""
+
+    run = models.ForeignKey(
+        to=JobRun, null=False, on_delete=models.CASCADE, related_name="events"
+    )
+    stage = models.CharField(
+        max_length=20,
+        choices=(
+            ("template", "template"),
+            ("checklist", "checklist"),
+            ("dataframe", "dataframe"),
+            ("md5", "md5"),
+            ("ftp", "ftp"),
+            ("taxonomy", "taxonomy"),
+            ("xml_build", "xml_build"),
+            ("xsd_validate", "xsd_validate"),
+            ("http_submit", "http_submit"),
+            ("receipt_parse", "receipt_parse"),
+            ("db_save", "db_save"),
+            ("webin_cli", "webin_cli"),
+        ),
+    )
+    started_at = models.DateTimeField()
+    seconds = models.FloatField()
+    # Transferred bytes, e.g. of the FTP uploads
+    bytes = models.BigIntegerField(null=True, blank=True)
+    info = models.JSONField(null=True, blank=True)
+
+    class Meta:
+        ordering = ("started_at", "id")
+
+    def __str__(self):
+        return f"{self.stage}: {self.seconds:.3f}s"
+
+
+class Accession(models.Model):
+    """An accession of a submitted job, indexed for exact and prefix lookups.
+
+    Filled from the results of the jobs, see `core.accessions`.
+    """
+
+    job = models.ForeignKey(
+        to=Job, null=False, on_delete=models.CASCADE, related_name="accessions"
+    )
+    schema = models.CharField(max_length=20)
+    alias = models.CharField(max_length=255, null=True, blank=True)
+    accession = models.CharField(max_length=50, null=True, blank=True)
+    status = models.CharField(max_length=20, null=True, blank=True)
+    submission_date = models.CharField(max_length=50, null=True, blank=True)
+
+    class Meta:
+        ordering = ("-job_id", "schema")
+        indexes = [
+            # The pattern ops serve the exact and the prefix (LIKE 'x%') lookups
+            models.Index(
+                fields=["accession"],
+                name="core_accession_accession_idx",
+                opclasses=["varchar_pattern_ops"],
+            ),
+            models.Index(
+                fields=["alias"],
+                name="core_accession_alias_idx",
+                opclasses=["varchar_pattern_ops"],
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.schema}: {self.accession} ({self.alias})"
+
+
+class Metric(models.Model):
+    """A counter shared by all processes, see `core.metrics`."""
+
+    name = models.CharField(max_length=100)
+    # The labels in the Prometheus text format, e.g. `stage="ftp",le="1.0"`
+    labels = models.CharField(max_length=255, blank=True, default="")
+    value = models.FloatField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["name", "labels"], name="core_metric_name_labels_uniq"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.name}{{{self.labels}}} {self.value}"
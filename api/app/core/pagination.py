@@ -0,0 +1,54 @@
+from django.conf import settings
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+class KeysetPagination(CursorPagination):
+    """Pages by the immutable creation time (and id), without an OFFSET."""
+
+    ordering = ("-created", "-id")
+    page_size_query_param = "page_size"
+    max_page_size = settings.MAX_PAGE_SIZE
+
+
+class JobPagination(PageNumberPagination):
+    """Page numbers by default, keyset pages with `?pagination=cursor`.
+
+    The next and previous links of the keyset pages carry the `cursor`. Both
+    modes accept a `?page_size=` up to MAX_PAGE_SIZE.
+    """
+
+    page_size_query_param = "page_size"
+    max_page_size = settings.MAX_PAGE_SIZE
+    keyset = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        params = request.query_params
+        if "cursor" in params or params.get("pagination") == "cursor":
+            self.keyset = KeysetPagination()
+            self.keyset.page_size = self.page_size
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def get_schema_operation_parameters(self, view):
+        parameters = super().get_schema_operation_parameters(view)
+        names = {parameter["name"] for parameter in parameters}
+        parameters += [
+            parameter
+            for parameter in KeysetPagination().get_schema_operation_parameters(view)
+            if parameter["name"] not in names
+        ]
+        parameters.append(
+            {
+                "name": "pagination",
+                "required": False,
+                "in": "query",
+                "description": "Set to `cursor` for keyset (cursor) pages.",
+                "schema": {"type": "string", "enum": ["cursor"]},
+            }
+        )
+        return parameters
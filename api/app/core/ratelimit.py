@@ -0,0 +1,82 @@
+import threading
+import time
+
+from django.conf import settings
+
+from core import log
+
+
+class AdaptiveRateLimiter:
+    """Token bucket whose refill rate adapts to the health of ENA.
+
+    Every call towards ENA takes a token. The rate grows additively while
+    the calls succeed and is halved on failures (throttling, server errors,
+    rejected receipts), always staying between `min_rate` and `max_rate`.
+    The limiter is shared by all worker threads of a process.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        rate: float,
+        min_rate: float,
+        max_rate: float,
+        burst: int = 1,
+    ):
+        self.name = name
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.rate = min(max(rate, min_rate), max_rate)
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def __refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, timeout: float = None) -> bool:
+        """Blocks until a call is allowed.
+
+        Returns False, without taking a token, if the call would not be
+        allowed within `timeout` seconds.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self.lock:
+                self.__refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return True
+                wait = (1 - self.tokens) / self.rate
+            if deadline is not None and time.monotonic() + wait > deadline:
+                return False
+            log.debug(f"Rate limit '{self.name}': waiting {wait:.2f}s")
+            time.sleep(wait)
+
+    def success(self):
+        with self.lock:
+            self.rate = min(self.max_rate, self.rate + self.max_rate / 10)
+
+    def failure(self):
+        with self.lock:
+            self.rate = max(self.min_rate, self.rate / 2)
+            # Do not allow a burst right after a failure
+            self.tokens = min(self.tokens, 0)
+        log.warning(f"Rate limit '{self.name}' reduced to {self.rate:.3f} calls/s")
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def rate_limiter(budget: str) -> AdaptiveRateLimiter:
+    """Returns the process wide limiter of a budget (`submit`, `ftp`, `webin`)."""
+    with _limiters_lock:
+        if budget not in _limiters:
+            _limiters[budget] = AdaptiveRateLimiter(
+                budget, **settings.ENA_RATE_LIMITS[budget]
+            )
+        return _limiters[budget]
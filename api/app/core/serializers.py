@@ -1,5 +1,14 @@
+from ena_upload_ms.dynamic_settings import dynamic_settings
 from rest_framework import serializers
-from .models import Job, File, AnalysisJob, AnalysisFile
+from .models import (
+    Accession,
+    AnalysisFile,
+    AnalysisJob,
+    File,
+    Job,
+    JobEvent,
+    JobRun,
+)
 
 
 class FileSerializer(serializers.ModelSerializer):
@@ -13,7 +22,46 @@ class FileSerializer(serializers.ModelSerializer):
         read_only_fields = ("md5sum",)
 
 
-class JobSerializer(serializers.ModelSerializer):
+class JobEventSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = JobEvent
+        fields = ("stage", "started_at", "seconds", "bytes", "info")
+
+
+class JobRunSerializer(serializers.ModelSerializer):
+    events = JobEventSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = JobRun
+        fields = (
+            "id",
+            "kind",
+            "status",
+            "batch_size",
+            "queued_at",
+            "started_at",
+            "finished_at",
+            "wait_seconds",
+            "run_seconds",
+            "events",
+        )
+
+
+class SparseFieldsMixin:
+    """Drops the fields that are not in the `fields` of the context.
+
+    The views select the fields with `?fields=` / `?omit=`.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        selected = self.context.get("fields")
+        if selected is not None:
+            for name in set(self.fields) - set(selected):
+                self.fields.pop(name)
+
+
+class JobSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     url = serializers.HyperlinkedRelatedField(
         read_only=True, view_name="jobs-detail", source="id"
     )
@@ -24,6 +72,7 @@ class JobSerializer(serializers.ModelSerializer):
         many=True, read_only=True, view_name="jobs-detail", source="children"
     )
     job_files = FileSerializer(many=True, read_only=True)
+    links = serializers.SerializerMethodField()
 
     class Meta:
         model = Job
@@ -31,6 +80,7 @@ class JobSerializer(serializers.ModelSerializer):
             "id",
             "url",
             "created_at",
+            "created",
             "status",
             "action",
             "template",
@@ -51,6 +101,7 @@ class JobSerializer(serializers.ModelSerializer):
         read_only_fields = (
             "id",
             "created_at",
+            "created",
             "status",
             "action",
             "submission",
@@ -63,6 +114,12 @@ class JobSerializer(serializers.ModelSerializer):
             "children",
         )
 
+    def get_links(self, job: Job):
+        # Looked up once per response, the context is shared by all rows
+        if "ena_browser_url" not in self.context:
+            self.context["ena_browser_url"] = dynamic_settings.ENA_BROWSER_URL()
+        return job.links_for(self.context["ena_browser_url"])
+
 
 class AnalysisFileSerializer(serializers.ModelSerializer):
     url = serializers.HyperlinkedRelatedField(
@@ -95,6 +152,7 @@ class AnalysisJobSerializer(serializers.ModelSerializer):
             "job",
             "job_url",
             "created_at",
+            "created",
             "status",
             "template",
             "data",
@@ -107,9 +165,52 @@ class AnalysisJobSerializer(serializers.ModelSerializer):
             "id",
             "job_url",
             "created_at",
+            "created",
             "status",
             "manifest",
             "result",
             "raw_result",
             "analysisjob_files",
         )
+
+
+class JobDetailSerializer(JobSerializer):
+    """A job with the timings of its runs."""
+
+    runs = JobRunSerializer(many=True, read_only=True)
+
+    class Meta(JobSerializer.Meta):
+        fields = JobSerializer.Meta.fields + ("queued_at", "runs")
+        read_only_fields = JobSerializer.Meta.read_only_fields + ("queued_at", "runs")
+
+
+class AnalysisJobDetailSerializer(AnalysisJobSerializer):
+    """An analysis job with the timings of its runs."""
+
+    runs = JobRunSerializer(many=True, read_only=True)
+
+    class Meta(AnalysisJobSerializer.Meta):
+        fields = AnalysisJobSerializer.Meta.fields + ("queued_at", "runs")
+        read_only_fields = AnalysisJobSerializer.Meta.read_only_fields + (
+            "queued_at",
+            "runs",
+        )
+
+
+class AccessionSerializer(serializers.ModelSerializer):
+    job_url = serializers.HyperlinkedRelatedField(
+        read_only=True, view_name="jobs-detail", source="job"
+    )
+
+    class Meta:
+        model = Accession
+        fields = (
+            "id",
+            "schema",
+            "alias",
+            "accession",
+            "status",
+            "submission_date",
+            "job",
+            "job_url",
+        )
@@ -0,0 +1,38 @@
+from django.db import connections, router, transaction
+from django.db.models.signals import post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone as tz
+
+from .models import AnalysisJob, Job
+
+# Postgres channel the upload workers LISTEN on
+QUEUE_CHANNEL = "ena_upload_queue"
+
+
+def notify_queue(model):
+    """Wakes up the upload workers once the current transaction is committed."""
+    db = router.db_for_write(model)
+
+    def notify():
+        with connections[db].cursor() as cursor:
+            cursor.execute(f"NOTIFY {QUEUE_CHANNEL}")
+
+    transaction.on_commit(notify, using=db)
+
+
+@receiver(pre_save, sender=Job)
+@receiver(pre_save, sender=AnalysisJob)
+def job_queued(sender, instance, **kwargs):
+    """Stamps new queued jobs, the enqueue views restamp requeued ones."""
+    if instance.status == "QUEUED" and (
+        instance.pk is None or instance.queued_at is None
+    ):
+        instance.queued_at = tz.now()
+
+
+@receiver(post_save, sender=Job)
+@receiver(post_save, sender=AnalysisJob)
+def job_saved(sender, instance, **kwargs):
+    """Created, cloned and (re)enqueued jobs are saved with status QUEUED."""
+    if instance.status == "QUEUED":
+        notify_queue(sender)
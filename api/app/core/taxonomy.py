@@ -0,0 +1,141 @@
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone as tz
+from rest_framework.exceptions import ValidationError
+
+from core import log
+
+from .ena_client import lookup_scientific_name, lookup_taxon_id
+from .models import Taxon
+
+
+class LRUCache:
+    """Small thread safe in-process LRU cache with a time to live."""
+
+    def __init__(self, size: int, ttl: float):
+        self.size = size
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires < time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            self.entries[key] = (value, time.monotonic() + self.ttl)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+
+_by_name = LRUCache(settings.ENA_TAXONOMY_LRU_SIZE, settings.ENA_TAXONOMY_TTL_SECS)
+_by_id = LRUCache(settings.ENA_TAXONOMY_LRU_SIZE, settings.ENA_TAXONOMY_TTL_SECS)
+
+
+def normalize_taxon_id(taxon_id):
+    if isinstance(taxon_id, float) and taxon_id.is_integer():
+        taxon_id = int(taxon_id)
+    return str(taxon_id).strip()
+
+
+def _fresh():
+    """The entries looked up within the TTL and the ones loaded from a dump."""
+    return Taxon.objects.filter(
+        Q(source="DUMP")
+        | Q(
+            updated_at__gte=tz.now() - timedelta(seconds=settings.ENA_TAXONOMY_TTL_SECS)
+        )
+    )
+
+
+def _remember(taxon_id: str, scientific_name: str, store: bool = False):
+    _by_id.set(taxon_id, scientific_name)
+    _by_name.set(scientific_name, taxon_id)
+    if store:
+        # The entries loaded from a dump are kept as they are
+        taxon, created = Taxon.objects.get_or_create(
+            taxon_id=taxon_id,
+            defaults={"scientific_name": scientific_name, "source": "ENA"},
+        )
+        if not created and taxon.source != "DUMP":
+            taxon.scientific_name = scientific_name
+            taxon.save()
+
+
+def prefetch(scientific_names=(), taxon_ids=()):
+    """Loads the cached entries of the given names and ids in one query each."""
+    names = {name.strip() for name in scientific_names if name}
+    names = [name for name in names if _by_name.get(name) is None]
+    ids = {normalize_taxon_id(taxon_id) for taxon_id in taxon_ids if taxon_id}
+    ids = [taxon_id for taxon_id in ids if _by_id.get(taxon_id) is None]
+    if names:
+        for taxon_id, name in (
+            _fresh()
+            .filter(scientific_name__in=names)
+            .values_list("taxon_id", "scientific_name")
+        ):
+            _remember(taxon_id, name)
+    if ids:
+        for taxon_id, name in (
+            _fresh().filter(taxon_id__in=ids).values_list("taxon_id", "scientific_name")
+        ):
+            _remember(taxon_id, name)
+
+
+def get_taxon_id(scientific_name: str, offline: bool = False):
+    """Returns the taxon id of a scientific name.
+
+    Looks in the in-process cache, then in the Taxon table and only then
+    asks the ENA taxonomy service. If `offline` is set, ENA is not asked and
+    None is returned for a name that is not cached.
+    """
+    scientific_name = scientific_name.strip()
+    taxon_id = _by_name.get(scientific_name)
+    if taxon_id is None:
+        prefetch(scientific_names=[scientific_name])
+        taxon_id = _by_name.get(scientific_name)
+    if taxon_id is None and not offline:
+        log.debug(f"Looking up taxon id of '{scientific_name}' at ENA")
+        found = lookup_taxon_id(scientific_name)
+        if found is None:
+            raise ValidationError(
+                f"No taxon id available for '{scientific_name}'. Is it a valid scientific name?"
+            )
+        taxon_id = normalize_taxon_id(found[0])
+        # The canonical name of ENA is stored, the given one only remembered
+        _remember(taxon_id, found[1], store=True)
+        _by_name.set(scientific_name, taxon_id)
+    return taxon_id
+
+
+def get_scientific_name(taxon_id, offline: bool = False):
+    """Returns the scientific name of a taxon id, see `get_taxon_id`."""
+    taxon_id = normalize_taxon_id(taxon_id)
+    scientific_name = _by_id.get(taxon_id)
+    if scientific_name is None:
+        prefetch(taxon_ids=[taxon_id])
+        scientific_name = _by_id.get(taxon_id)
+    if scientific_name is None and not offline:
+        log.debug(f"Looking up scientific name of '{taxon_id}' at ENA")
+        scientific_name = lookup_scientific_name(taxon_id)
+        if scientific_name is None:
+            raise ValidationError(
+                f"No scientific name available for '{taxon_id}'. Is it a valid taxon id?"
+            )
+        _remember(taxon_id, scientific_name, store=True)
+    return scientific_name
@@ -0,0 +1,105 @@
+import threading
+import time
+from os import stat
+from os.path import join
+from types import MappingProxyType
+
+import yaml
+from django.conf import settings
+
+from core import log
+
+
+def freeze(value):
+    """Returns a read-only copy of the parsed yaml value."""
+    if isinstance(value, dict):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+def thaw(value):
+    """Returns a mutable copy of a frozen value."""
+    if isinstance(value, MappingProxyType):
+        return {key: thaw(item) for key, item in value.items()}
+    if isinstance(value, tuple):
+        return [thaw(item) for item in value]
+    return value
+
+
+class ProjectTemplate:
+    """A parsed project template (`<TEMPLATE_DIR>/<name>.yml`)."""
+
+    def __init__(self, path: str, mtime_ns: int, data: dict):
+        self.path = path
+        self.mtime_ns = mtime_ns
+        self.checked_at = time.monotonic()
+        self.data = freeze(data)
+        # The alias keys per section whose values contain the {} placeholder
+        self.alias_keys = MappingProxyType(
+            {
+                section: tuple(
+                    key
+                    for key, value in values.items()
+                    if key.endswith("alias")
+                    and isinstance(value, str)
+                    and "{}" in value
+                )
+                for section, values in data.items()
+                if isinstance(values, dict)
+            }
+        )
+
+    def thaw(self, ignore=()):
+        """Returns a mutable copy of the template without the ignored sections."""
+        return {
+            section: thaw(values)
+            for section, values in self.data.items()
+            if section not in ignore
+        }
+
+    def section(self, name: str):
+        """Returns a mutable copy of a section, or None if it is not defined."""
+        return thaw(self.data[name]) if name in self.data else None
+
+
+_templates = {}
+_templates_lock = threading.Lock()
+
+
+def template_file_path(name: str):
+    return join(settings.TEMPLATE_DIR, f"{name}.yml")
+
+
+def get_template(name: str):
+    """Returns the parsed template, or None if the template file does not exist.
+
+    Each template is parsed once per process and reloaded when its mtime
+    changes. The mtime is checked at most every ENA_TEMPLATE_CHECK_SECS.
+    """
+    path = template_file_path(name)
+    with _templates_lock:
+        template = _templates.get(path)
+    now = time.monotonic()
+    if template and now - template.checked_at < settings.ENA_TEMPLATE_CHECK_SECS:
+        return template
+    try:
+        mtime_ns = stat(path).st_mtime_ns
+    except FileNotFoundError:
+        with _templates_lock:
+            _templates.pop(path, None)
+        return None
+    if template and template.mtime_ns == mtime_ns:
+        template.checked_at = now
+        return template
+
+    log.debug(f"Loading template file: {path}")
+    with open(path, "r") as tf:
+        # We use BaseLoader to handle all values as string
+        template = ProjectTemplate(
+            path, mtime_ns, yaml.load(tf, Loader=yaml.BaseLoader) or {}
+        )
+    with _templates_lock:
+        _templates[path] = template
+    return template
@@ -1,3 +1,296 @@
-from django.test import TestCase
+import hashlib
+import threading
+from datetime import timedelta
+from os import utime
+from os.path import abspath, dirname, exists, join
+from shutil import copyfile
+from tempfile import NamedTemporaryFile, TemporaryDirectory
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connections, router, transaction
+from django.test import (
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.utils import timezone as tz
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+
+from . import checklists, ftp, taxonomy
+from .models import FTPUpload, Job, Taxon
+from .worker import claim_jobs
+
+REPO_DIR = dirname(dirname(dirname(dirname(abspath(__file__)))))
+
+
+def shipped(*paths):
+    """The first existing path, in the container or in the repository."""
+    return next(path for path in paths if exists(path))
+
+
+DEFAULT_TEMPLATE = shipped(
+    join(settings.TEMPLATE_DIR, "default.yml.TEMPLATE"),
+    join(REPO_DIR, "templates", "default.yml.TEMPLATE"),
+)
+ENA_TEMPLATE_DIR = shipped(
+    settings.ENA_XML_TEMPLATE_DIR, join(REPO_DIR, "api", "ena_templates")
+)
+
+
+class APITestCase(TestCase):
+    """Runs the API with the shipped default template."""
+
+    databases = "__all__"
+
+    def setUp(self):
+        self.template_dir = TemporaryDirectory()
+        copyfile(DEFAULT_TEMPLATE, join(self.template_dir.name, "default.yml"))
+        overrides = override_settings(
+            TEMPLATE_DIR=self.template_dir.name,
+            ENA_XML_TEMPLATE_DIR=ENA_TEMPLATE_DIR,
+            ENA_CHECKLIST_VALIDATION=True,
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.addCleanup(self.template_dir.cleanup)
+        checklists._index = None
+        self.addCleanup(setattr, checklists, "_index", None)
+        self.user = get_user_model().objects.create(username="tester")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+
+@override_settings(ENA_XML_TEMPLATE_DIR=ENA_TEMPLATE_DIR)
+class ChecklistTests(SimpleTestCase):
+    def setUp(self):
+        checklists._index = None
+        self.addCleanup(setattr, checklists, "_index", None)
+
+    def test_empty_string_is_accepted(self):
+        # Like the `mandatorytest` of the templates
+        for value in ["", "x", 0]:
+            self.assertFalse(checklists.is_missing(value))
+        for value in [None, float("nan"), " ", "\t"]:
+            self.assertTrue(checklists.is_missing(value))
+
+    def test_missing_mandatory_field(self):
+        study = checklists.checklist_index()["study"]
+        errors = study.violations("study", {"alias": "study"})
+        self.assertIn("The mandatory field 'title' is missing.", errors)
+        errors = study.violations("study", {"alias": "study", "title": ""})
+        self.assertNotIn("The mandatory field 'title' is missing.", errors)
+
+
+class DefaultTemplateTests(APITestCase):
+    def test_create_job_from_default_template(self):
+        response = self.client.post(
+            reverse("jobs-list"), {"template": "default", "data": {}}, format="json"
+        )
+        self.assertEqual(response.status_code, 201, response.data)
+        job = Job.objects.get(pk=response.data["id"])
+        self.assertEqual(job.data["sample"]["collector name"], "")
+
+
+class BulkTests(APITestCase):
+    def test_create_jobs(self):
+        response = self.client.post(
+            reverse("jobs-bulk"),
+            [{"template": "default", "data": {}}] * 2,
+            format="json",
+        )
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(response.data["created"], 2)
+        self.assertEqual(Job.objects.filter(status="QUEUED").count(), 2)
+
+    def test_nothing_is_created_if_a_job_is_invalid(self):
+        response = self.client.post(
+            reverse("jobs-bulk"),
+            [
+                {"template": "default", "data": {}},
+                {"template": "default", "data": {"study": {"title": " "}}},
+            ],
+            format="json",
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data["created"], 0)
+        self.assertEqual(
+            [result["status"] for result in response.data["results"]],
+            ["VALID", "INVALID"],
+        )
+        self.assertIn("study", response.data["results"][1]["errors"])
+        self.assertFalse(Job.objects.exists())
+
+
+class KeysetPaginationTests(APITestCase):
+    def test_cursor_pages_list_every_job_once(self):
+        jobs = [Job.objects.create(data={}) for _ in range(5)]
+        url = reverse("jobs-list") + "?pagination=cursor&page_size=2&fields=id"
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            ids += [job["id"] for job in response.data["results"]]
+            url = response.data["next"]
+        self.assertEqual(ids, [job.id for job in reversed(jobs)])
+
+
+class ClaimTests(TransactionTestCase):
+    databases = "__all__"
+
+    def test_locked_jobs_are_skipped(self):
+        first, second = Job.objects.create(data={}), Job.objects.create(data={})
+        db = router.db_for_write(Job)
+        locked, release = threading.Event(), threading.Event()
+
+        def lock_first():
+            try:
+                with transaction.atomic(using=db):
+                    Job.objects.using(db).select_for_update().get(pk=first.pk)
+                    locked.set()
+                    release.wait(10)
+            finally:
+                connections[db].close()
+
+        thread = threading.Thread(target=lock_first)
+        thread.start()
+        locked.wait(10)
+        try:
+            jobs = claim_jobs(Job, limit=2)
+        finally:
+            release.set()
+            thread.join()
+        self.assertEqual([job.pk for job in jobs], [second.pk])
+        second.refresh_from_db()
+        self.assertEqual(second.status, "RUNNING")
+        self.assertIsNotNone(second.claimed_at)
+
+    def test_running_jobs_are_claimed_once_their_lease_expired(self):
+        expired = tz.now() - timedelta(seconds=settings.ENA_JOB_LEASE_SECS + 1)
+        stale = Job.objects.create(data={}, status="RUNNING", claimed_at=expired)
+        Job.objects.create(data={}, status="RUNNING", claimed_at=tz.now())
+        jobs = claim_jobs(Job, limit=2)
+        self.assertEqual([job.pk for job in jobs], [stale.pk])
+        self.assertGreater(jobs[0].claimed_at, expired)
+
+
+class FakeFTP:
+    """Stands in for an FTPS session, the remote file has `remote` bytes."""
+
+    def __init__(self, remote=None):
+        self.remote = remote
+        self.rest = None
+        self.sent = b""
+
+    def voidcmd(self, command):
+        pass
+
+    def size(self, filename):
+        if self.remote is None:
+            raise ftp.ftplib.error_perm("550 No such file")
+        return self.remote
+
+    def storbinary(self, command, fh, blocksize, callback, rest=None):
+        self.rest = rest
+        for block in iter(lambda: fh.read(blocksize), b""):
+            self.sent += block
+            callback(block)
+        return "226 Transfer complete"
+
+
+@override_settings(ENA_FTP_RESUME=True, ENA_FTP_BLOCK_SIZE=4)
+class FTPUploadTests(SimpleTestCase):
+    content = b"0123456789"
+    md5sum = hashlib.md5(content).hexdigest()
+
+    def setUp(self):
+        self.file = NamedTemporaryFile()
+        self.file.write(self.content)
+        self.file.flush()
+        self.addCleanup(self.file.close)
+
+    def upload(self, session, recorded=None):
+        return ftp.upload_file(session, "run.fastq", self.file.name, None, recorded)
+
+    def test_unrecorded_partial_upload_is_uploaded_again(self):
+        session = FakeFTP(remote=4)
+        self.assertEqual(self.upload(session), self.md5sum)
+        self.assertIsNone(session.rest)
+        self.assertEqual(session.sent, self.content)
+
+    def test_recorded_partial_upload_is_resumed(self):
+        session = FakeFTP(remote=4)
+        self.assertEqual(self.upload(session, FTPUpload()), self.md5sum)
+        self.assertEqual(session.rest, 4)
+        self.assertEqual(session.sent, self.content[4:])
+
+    def test_recorded_completed_upload_is_skipped(self):
+        session = FakeFTP(remote=len(self.content))
+        recorded = FTPUpload(md5sum=self.md5sum)
+        self.assertEqual(self.upload(session, recorded), self.md5sum)
+        self.assertEqual(session.sent, b"")
+
+    def test_unrecorded_complete_file_is_uploaded_again(self):
+        session = FakeFTP(remote=len(self.content))
+        self.assertEqual(self.upload(session), self.md5sum)
+        self.assertEqual(session.sent, self.content)
+
+
+class FTPUploadRecordTests(TestCase):
+    databases = "__all__"
+
+    def test_only_uploads_of_unchanged_files_are_recorded(self):
+        with NamedTemporaryFile() as file:
+            file_paths = {"run.fastq": file.name}
+            _, recorded = ftp.start_uploads(file_paths)
+            self.assertEqual(recorded, {})
+            _, recorded = ftp.start_uploads(file_paths)
+            self.assertIn("run.fastq", recorded)
+            utime(file.name, ns=(0, 0))
+            _, recorded = ftp.start_uploads(file_paths)
+            self.assertEqual(recorded, {})
+
+
+class TaxonomyTests(TestCase):
+    databases = "__all__"
+
+    def setUp(self):
+        for cache in [taxonomy._by_name, taxonomy._by_id]:
+            cache.entries.clear()
+            self.addCleanup(cache.entries.clear)
+        expired = tz.now() - timedelta(seconds=settings.ENA_TAXONOMY_TTL_SECS + 1)
+        Taxon.objects.create(taxon_id="9606", scientific_name="Homo sapiens")
+        Taxon.objects.create(taxon_id="10090", scientific_name="Mus musculus")
+        Taxon.objects.filter(taxon_id="9606").update(source="DUMP", updated_at=expired)
+        Taxon.objects.filter(taxon_id="10090").update(updated_at=expired)
+
+    @mock.patch.object(taxonomy, "lookup_scientific_name")
+    def test_dump_entries_do_not_expire(self, lookup):
+        self.assertEqual(taxonomy.get_scientific_name("9606"), "Homo sapiens")
+        lookup.assert_not_called()
+
+    @mock.patch.object(taxonomy, "lookup_scientific_name")
+    def test_expired_entries_are_looked_up(self, lookup):
+        lookup.return_value = "Mus musculus"
+        self.assertEqual(taxonomy.get_scientific_name("10090"), "Mus musculus")
+        lookup.assert_called_once_with("10090")
+
+    @mock.patch.object(taxonomy, "lookup_taxon_id")
+    def test_canonical_name_is_stored(self, lookup):
+        lookup.return_value = (7955, "Danio rerio")
+        self.assertEqual(taxonomy.get_taxon_id("danio Rerio"), "7955")
+        self.assertEqual(
+            Taxon.objects.get(taxon_id="7955").scientific_name, "Danio rerio"
+        )
+
+    @mock.patch.object(taxonomy, "lookup_taxon_id")
+    def test_dump_entries_are_not_overwritten(self, lookup):
+        lookup.return_value = (9606, "Homo sapiens")
+        self.assertEqual(taxonomy.get_taxon_id("homo Sapiens"), "9606")
+        taxon = Taxon.objects.get(taxon_id="9606")
+        self.assertEqual(
+            (taxon.source, taxon.scientific_name), ("DUMP", "Homo sapiens")
+        )
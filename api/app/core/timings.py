@@ -0,0 +1,148 @@
+import contextlib
+import threading
+import time
+
+from django.db import router, transaction
+from django.utils import timezone as tz
+
+from core import log
+
+from . import metrics
+from .models import AnalysisJob, JobEvent, JobRun
+
+# The recorders of the jobs the current thread is working on
+_local = threading.local()
+
+
+class RunRecorder:
+    """Collects the timed stages of one run of a job or analysis job."""
+
+    def __init__(self, job, kind: str, batch_size: int = 1):
+        self.job = job
+        self.kind = kind
+        self.batch_size = batch_size
+        self.queued_at = job.queued_at
+        self.started_at = tz.now()
+        self.events = []
+
+    def add(
+        self, stage: str, started_at, seconds: float, bytes=None, info: dict = None
+    ):
+        self.events.append(
+            JobEvent(
+                stage=stage,
+                started_at=started_at,
+                seconds=seconds,
+                bytes=bytes,
+                info=info,
+            )
+        )
+
+    def save(self):
+        """Stores the run with its events, the job is stored already."""
+        analysis = isinstance(self.job, AnalysisJob)
+        run = JobRun.objects.create(
+            job=None if analysis else self.job,
+            analysis_job=self.job if analysis else None,
+            kind=self.kind,
+            status=self.job.status,
+            batch_size=self.batch_size,
+            queued_at=self.queued_at,
+            started_at=self.started_at,
+            finished_at=tz.now(),
+        )
+        for event in self.events:
+            event.run = run
+        JobEvent.objects.bulk_create(self.events)
+        return run
+
+
+def _recorders():
+    """The recorders the current stage is attributed to."""
+    recorders = getattr(_local, "recorders", None) or {}
+    focused = getattr(_local, "focus", None)
+    if focused is None:
+        return list(recorders.values())
+    return [recorders[key] for key in focused if key in recorders]
+
+
+@contextlib.contextmanager
+def track(jobs: list, kind: str = "SUBMIT"):
+    """Records a run of the given jobs with the stages timed meanwhile.
+
+    The runs are stored when the block is left, also if it failed, with the
+    then status of the jobs, and the metrics of the process are flushed (after
+    the commit, if the block runs in a transaction). A failure to store them
+    is only logged.
+    """
+    recorders = {id(job): RunRecorder(job, kind, len(jobs)) for job in jobs}
+    previous = getattr(_local, "recorders", None), getattr(_local, "focus", None)
+    _local.recorders, _local.focus = recorders, None
+    try:
+        yield
+    finally:
+        _local.recorders, _local.focus = previous
+        for recorder in recorders.values():
+            try:
+                # In a savepoint, a failure must not break a surrounding
+                # transaction
+                with transaction.atomic(using=router.db_for_write(JobRun)):
+                    recorder.save()
+            except Exception as ex:
+                log.warning(f"Cannot store the timings of {recorder.job}: {ex}")
+            metrics.inc(
+                "ena_upload_job_runs_total",
+                model=recorder.job._meta.model_name,
+                kind=recorder.kind,
+                status=recorder.job.status,
+            )
+        metrics.flush()
+
+
+@contextlib.contextmanager
+def focus(jobs: list):
+    """Attributes the stages timed within the block to the given jobs only,
+    e.g. while a single job of a batch is prepared."""
+    previous = getattr(_local, "focus", None)
+    _local.focus = [id(job) for job in jobs]
+    try:
+        yield
+    finally:
+        _local.focus = previous
+
+
+@contextlib.contextmanager
+def stage(name: str):
+    """Times the block as a stage of the tracked jobs.
+
+    Yields a dict in which the block can report the processed `bytes` and
+    further `info`. Does nothing if no jobs are tracked. The duration (and
+    the FTP throughput) also goes into the histograms of `core.metrics`.
+    """
+    recorders = _recorders()
+    stats = {}
+    if not recorders:
+        yield stats
+        return
+    started_at = tz.now()
+    started = time.perf_counter()
+    error = None
+    try:
+        yield stats
+    except Exception as ex:
+        error = type(ex).__name__
+        raise
+    finally:
+        seconds = time.perf_counter() - started
+        info = stats.get("info")
+        if error:
+            info = {**(info or {}), "error": error}
+        for recorder in recorders:
+            recorder.add(name, started_at, seconds, stats.get("bytes"), info)
+        metrics.observe("ena_upload_stage_seconds", seconds, stage=name)
+        if name == "ftp" and stats.get("bytes") and not error:
+            metrics.inc("ena_upload_ftp_bytes_total", stats["bytes"])
+            if seconds > 0:
+                metrics.observe(
+                    "ena_upload_ftp_bytes_per_second", stats["bytes"] / seconds
+                )
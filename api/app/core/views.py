@@ -3,30 +3,47 @@ from datetime import datetime as dt
 from os import listdir
 from os.path import basename, isdir, isfile, join
 
-import yaml
 from constance import config
 from django.conf import settings
-from django.db.models import Count, Q
+from django.db import router, transaction
+from django.db.models import Count, Prefetch, Q
+from django.http import HttpResponse
 from django.utils import timezone as tz
 from django.utils.translation import gettext_lazy as _
-from ena_upload import ena_upload as ena
 from ena_upload_ms.dynamic_settings import dynamic_settings
 from rest_framework import mixins, status, viewsets
 from rest_framework.decorators import action
 from rest_framework.exceptions import APIException, ValidationError
+from rest_framework.parsers import JSONParser
 from rest_framework.response import Response
+from rest_framework.reverse import reverse
 from rest_framework.views import APIView
 
-from .ena_helpers import SCHEMAS, apply_template, webin_validate
-from .filters import JobFilterSet
+from . import metrics, timings, xsd
+from .checklists import check_job
+from .checksums import get_md5
+from .ena_helpers import (
+    SCHEMAS,
+    apply_template,
+    build_xmls,
+    prepare_upload,
+    webin_validate,
+)
+from .filters import AccessionFilterSet, JobFilterSet
 from .helpers import merge
 from .models import AnalysisJob, Job
+from .parsers import NDJSONParser
 from .serializers import (
+    AccessionSerializer,
     AnalysisFileSerializer,
+    AnalysisJobDetailSerializer,
     AnalysisJobSerializer,
     FileSerializer,
+    JobDetailSerializer,
     JobSerializer,
 )
+from .signals import notify_queue
+from .template_registry import get_template, template_file_path
 
 
 ###
@@ -41,6 +58,19 @@ class DeleteNotAllowed(APIException):
 ###
 # Main Viewsets
 ###
+# The large columns, only loaded if their fields are returned
+DEFERRABLE_FIELDS = {
+    "data": "data",
+    "submission": "submission",
+    "raw_submission": "raw_submission",
+    "result": "result",
+    "links": "result",
+    "raw_result": "raw_result",
+}
+# The receipt and submission XMLs are only listed on request
+LIST_OMIT = ("raw_submission", "raw_result")
+
+
 class JobViewset(
     mixins.CreateModelMixin,
     mixins.RetrieveModelMixin,
@@ -50,12 +80,77 @@ class JobViewset(
     serializer_class = JobSerializer
     filterset_class = JobFilterSet
 
+    def get_serializer_class(self):
+        if self.action == "retrieve":
+            return JobDetailSerializer
+        return super().get_serializer_class()
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.action in ["list", "retrieve"]:
+            context["fields"] = self.__selected_fields()
+        return context
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action not in ["list", "retrieve"]:
+            return queryset
+        fields = self.__selected_fields()
+        if fields is None:
+            fields = self.get_serializer_class().Meta.fields
+        if "job_files" in fields:
+            queryset = queryset.prefetch_related("job_files")
+        if "children" in fields or "children_url" in fields:
+            queryset = queryset.prefetch_related(
+                Prefetch("children", queryset=Job.objects.only("id", "parent"))
+            )
+        if "runs" in fields:
+            queryset = queryset.prefetch_related("runs__events")
+        needed = {
+            DEFERRABLE_FIELDS[name] for name in fields if name in DEFERRABLE_FIELDS
+        }
+        return queryset.defer(*(set(DEFERRABLE_FIELDS.values()) - needed))
+
+    def __selected_fields(self):
+        """The fields selected with `?fields=` or `?omit=`, None for all.
+
+        The list omits the raw XMLs, unless `?fields=` or `?omit=` is given.
+        """
+        if not hasattr(self, "_selected_fields"):
+            params = self.request.query_params
+            known = self.get_serializer_class().Meta.fields
+            if "fields" in params:
+                names = [name for name in params["fields"].split(",") if name]
+            elif "omit" in params:
+                names = [name for name in params["omit"].split(",") if name]
+            elif self.action == "list":
+                names = LIST_OMIT
+            else:
+                names = []
+            unknown = set(names) - set(known)
+            if unknown:
+                raise ValidationError(f"Unknown fields: {', '.join(sorted(unknown))}")
+            if "fields" in params:
+                self._selected_fields = [name for name in known if name in names]
+            elif names:
+                self._selected_fields = [name for name in known if name not in names]
+            else:
+                self._selected_fields = None
+        return self._selected_fields
+
     def perform_create(self, serializer: JobSerializer, modify: bool = False):
-        job = serializer.save(owner=self.request.user)
-        apply_template(job)
-        if modify:
-            job.action = "MODIFY"
-        job.save()
+        # Nothing is stored (nor queued) if the job is not valid
+        with transaction.atomic(using=router.db_for_write(Job)):
+            job = serializer.save(owner=self.request.user)
+            with timings.track([job], kind="CREATE"):
+                with timings.stage("template"):
+                    apply_template(job)
+                if modify:
+                    job.action = "MODIFY"
+                with timings.stage("checklist"):
+                    check_job(job)
+                with timings.stage("db_save"):
+                    job.save()
         return job
 
     ###
@@ -107,11 +202,74 @@ class JobViewset(
         """sample, experiment, run"""
         return self.__perform_create_with_ignore(request, ["study"])
 
+    @action(
+        detail=False, methods=["post"], parser_classes=[JSONParser, NDJSONParser]
+    )
+    def bulk(self, request):
+        """Creates the jobs of a JSON array (or NDJSON lines) in one transaction.
+
+        Nothing is stored if any job is invalid. The jobs are queued unless
+        `?enqueue=false` is given, then they are stored as DRAFT.
+        """
+        items = request.data
+        if not isinstance(items, list) or not items:
+            raise ValidationError("Expected a non-empty list of jobs.")
+        if len(items) > settings.MAX_BULK_JOBS:
+            raise ValidationError(
+                f"At most {settings.MAX_BULK_JOBS} jobs can be created at once."
+            )
+        enqueue = request.query_params.get("enqueue", "true").lower() != "false"
+
+        jobs = []
+        results = []
+        for index, item in enumerate(items):
+            serializer = JobSerializer(data=item, context={"request": request})
+            if not serializer.is_valid():
+                results.append(
+                    {"index": index, "status": "INVALID", "errors": serializer.errors}
+                )
+                continue
+            job = Job(
+                owner=request.user,
+                status="QUEUED" if enqueue else "DRAFT",
+                queued_at=tz.now() if enqueue else None,
+                **serializer.validated_data,
+            )
+            try:
+                apply_template(job)
+                check_job(job)
+            except ValidationError as ex:
+                results.append(
+                    {"index": index, "status": "INVALID", "errors": ex.detail}
+                )
+                continue
+            jobs.append(job)
+            results.append({"index": index, "status": "VALID"})
+
+        if len(jobs) < len(items):
+            return Response(
+                {"created": 0, "results": results}, status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # bulk_create skips the signals, the workers are notified here
+        with transaction.atomic(using=router.db_for_write(Job)):
+            Job.objects.bulk_create(jobs)
+            if enqueue:
+                notify_queue(Job)
+        for result, job in zip(results, jobs):
+            result["status"] = "CREATED"
+            result["id"] = job.id
+            result["url"] = reverse("jobs-detail", args=[job.id], request=request)
+        return Response(
+            {"created": len(jobs), "results": results}, status=status.HTTP_201_CREATED
+        )
+
     @action(detail=True, methods=["get"])
     def enqueue(self, request, pk=None):
         job = Job.objects.get(pk=pk)
         if job.status != "SUBMITTED" or ("force" in request.query_params):
             job.status = "QUEUED"
+            job.queued_at = tz.now()
             job.save()
             serializer = JobSerializer(instance=job, context={"request": request})
             return Response(serializer.data)
@@ -121,6 +279,34 @@ class JobViewset(
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
+    @action(detail=True, methods=["get"])
+    def validate(self, request, pk=None):
+        """Validates the XMLs of the job against the XSDs without submitting.
+
+        The run files are not hashed and the taxonomy is not looked up at ENA,
+        see `prepare_upload`.
+        """
+        job = Job.objects.get(pk=pk)
+        schema_dataframe, schema_targets = prepare_upload(job, offline=True)
+        schema_xmls, submission_xml = build_xmls(
+            [(job, schema_dataframe, schema_targets)]
+        )
+        schema_xmls["submission"] = submission_xml
+        errors = xsd.validate_xmls(schema_xmls)
+        return Response(
+            {
+                "Job": {"id": job.id},
+                "Validation": {
+                    "VALID": not errors,
+                    "ERROR": errors,
+                    "XML": {
+                        schema: xml.decode("utf-8")
+                        for schema, xml in schema_xmls.items()
+                    },
+                },
+            }
+        )
+
     ###
     # SPECIAL ACTIONS FOR JOBS
     ###
@@ -157,6 +343,7 @@ class JobViewset(
                 # TODO: check if basenames of files are the same
                 # otherwise ena will not accept it
                 new_job.files = request.data["files"]
+        check_job(new_job)
         new_job.save()
         result = JobSerializer(new_job, context={"request": request})
         return Response(result.data)
@@ -190,23 +377,26 @@ class AnalysisJobViewset(
 ):
     serializer_class = AnalysisJobSerializer
 
+    def get_serializer_class(self):
+        if self.action == "retrieve":
+            return AnalysisJobDetailSerializer
+        return super().get_serializer_class()
+
     def perform_create(self, serializer: AnalysisJobSerializer):
-        template_file = join(
-            settings.TEMPLATE_DIR, f"{serializer.validated_data['template']}.yml"
-        )
-        if isfile(template_file):
+        template = get_template(serializer.validated_data["template"])
+        if template is not None:
             job = serializer.save(owner=self.request.user)
-            with open(template_file, "r") as tf:
-                template = yaml.load(tf, Loader=yaml.BaseLoader)
-                if "analysis" in template:
-                    job.data = merge(template["analysis"], job.data)
-                # Replace {} in the name with the timestamp
-                ts = dt.strftime(tz.now(), "%Y%m%d%H%M%S%f")
-                if "name" in job.data:
-                    job.data["name"] = job.data["name"].replace("{}", ts)
+            analysis = template.section("analysis")
+            if analysis is not None:
+                job.data = merge(analysis, job.data)
+            # Replace {} in the name with the timestamp
+            ts = dt.strftime(tz.now(), "%Y%m%d%H%M%S%f")
+            if "name" in job.data:
+                job.data["name"] = job.data["name"].replace("{}", ts)
             job.save()
             return job
         else:
+            template_file = template_file_path(serializer.validated_data["template"])
             raise ValidationError(f"Template file {template_file} does not exist.")
 
     def perform_destroy(self, instance):
@@ -220,6 +410,7 @@ class AnalysisJobViewset(
         job = AnalysisJob.objects.get(pk=pk)
         if job.status != "SUBMITTED":
             job.status = "QUEUED"
+            job.queued_at = tz.now()
             job.save()
             serializer = AnalysisJobSerializer(
                 instance=job, context={"request": request}
@@ -294,13 +485,24 @@ class AnalysisFileViewset(
     def perform_create(self, serializer: AnalysisFileSerializer):
         file = serializer.save()
         if isfile(file.file_name):
-            file.md5sum = ena.get_md5(file.file_name)
+            file.md5sum = get_md5(file.file_name)
             file.save()
             return file
         else:
             raise ValidationError(f"File {file.file_name} does not exist.")
 
 
+class AccessionViewset(
+    mixins.RetrieveModelMixin,
+    mixins.ListModelMixin,
+    viewsets.GenericViewSet,
+):
+    """Exact (`?accession=`) and prefix (`?accession__startswith=`) lookups"""
+
+    serializer_class = AccessionSerializer
+    filterset_class = AccessionFilterSet
+
+
 class Dev(APIView):
     def get(self, request, *args, **kwargs):
         value = request.query_params.get("value")
@@ -325,3 +527,12 @@ class Dev(APIView):
                 "ENA_DB": Job.objects.db,
             }
         )
+
+
+class Metrics(APIView):
+    """The metrics of all processes in the Prometheus text format"""
+
+    def get(self, request, *args, **kwargs):
+        return HttpResponse(
+            metrics.render(), content_type="text/plain; version=0.0.4; charset=utf-8"
+        )
@@ -0,0 +1,326 @@
+import contextlib
+import select
+import threading
+import time
+from datetime import timedelta
+
+import psycopg2
+from constance import config
+from django.conf import settings
+from django.db import close_old_connections, connections, router, transaction
+from django.db.models import Q
+from django.utils import timezone as tz
+
+from core import log
+
+from . import metrics, timings
+from .ena_helpers import batch_key, ena_upload, ena_upload_batch, webin_upload
+from .models import AnalysisJob, Job
+from .signals import QUEUE_CHANNEL
+
+
+class QueueListener:
+    """Waits for NOTIFYs on the queue channel of all configured databases.
+
+    Uses dedicated connections, because the ORM connections of the worker
+    are closed and reopened between the runs, which drops the LISTEN.
+    """
+
+    def __init__(self):
+        self.connections = {}
+
+    def connect(self):
+        for alias in settings.DATABASES:
+            conn = self.connections.get(alias)
+            if conn is not None and not conn.closed:
+                continue
+            wrapper = connections[alias]
+            conn = wrapper.get_new_connection(wrapper.get_connection_params())
+            conn.autocommit = True
+            with conn.cursor() as cursor:
+                cursor.execute(f"LISTEN {QUEUE_CHANNEL}")
+            self.connections[alias] = conn
+
+    def close(self):
+        for conn in self.connections.values():
+            if not conn.closed:
+                conn.close()
+        self.connections = {}
+
+    def wait(self, timeout: float, stop: threading.Event) -> bool:
+        """Blocks until a job gets queued, `timeout` passed or `stop` is set.
+
+        Falls back to plain polling if the databases cannot be listened to.
+        Returns True if woken up by a notification.
+        """
+        deadline = time.monotonic() + timeout
+        while not stop.is_set():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            try:
+                self.connect()
+                ready, _, _ = select.select(
+                    list(self.connections.values()), [], [], min(remaining, 1)
+                )
+                for conn in ready:
+                    conn.poll()
+                    conn.notifies.clear()
+                if ready:
+                    return True
+            except (psycopg2.Error, OSError) as ex:
+                log.warning(f"Cannot listen for queued jobs, polling instead: {ex}")
+                self.close()
+                stop.wait(remaining)
+        return False
+
+
+class LeaseKeeper:
+    """Renews the leases of the jobs the workers of this process work on.
+
+    The leases of the jobs of a crashed or killed worker are not renewed, so
+    these jobs are claimed again once ENA_JOB_LEASE_SECS passed.
+    """
+
+    def __init__(self):
+        self.held = {}
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def start(self):
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(
+                    target=self.run, name="lease-keeper", daemon=True
+                )
+                self.thread.start()
+
+    @contextlib.contextmanager
+    def hold(self, model, jobs: list):
+        """Renews the leases of the jobs while the block runs."""
+        with self.lock:
+            for job in jobs:
+                self.held[(model, job.pk)] = self.held.get((model, job.pk), 0) + 1
+        try:
+            yield
+        finally:
+            with self.lock:
+                for job in jobs:
+                    self.held[(model, job.pk)] -= 1
+                    if not self.held[(model, job.pk)]:
+                        del self.held[(model, job.pk)]
+
+    def renew(self):
+        with self.lock:
+            held = list(self.held)
+        for model in {model for model, _ in held}:
+            model.objects.using(router.db_for_write(model)).filter(
+                pk__in=[pk for held_model, pk in held if held_model is model],
+                status="RUNNING",
+            ).update(claimed_at=tz.now())
+
+    def run(self):
+        while True:
+            time.sleep(settings.ENA_JOB_LEASE_SECS / 3)
+            try:
+                close_old_connections()
+                self.renew()
+            except Exception as ex:
+                log.warning(f"Cannot renew the leases of the running jobs: {ex}")
+
+
+_leases = LeaseKeeper()
+
+
+def claimable(model, db: str):
+    """The queued jobs and the running ones whose lease expired."""
+    expired = tz.now() - timedelta(seconds=settings.ENA_JOB_LEASE_SECS)
+    return (
+        model.objects.using(db)
+        .select_for_update(skip_locked=True)
+        .filter(
+            Q(status="QUEUED")
+            | Q(status="RUNNING", claimed_at__isnull=True)
+            | Q(status="RUNNING", claimed_at__lt=expired)
+        )
+        .order_by("id")
+    )
+
+
+def claim(model, db: str, jobs: list):
+    """Flips the (locked) jobs to RUNNING with a new lease."""
+    now = tz.now()
+    for job in jobs:
+        if job.status == "RUNNING":
+            log.warning(f"The lease of {job} expired, claiming it again...")
+        job.status = "RUNNING"
+        job.claimed_at = now
+    model.objects.using(db).filter(pk__in=[job.pk for job in jobs]).update(
+        status="RUNNING", claimed_at=now
+    )
+
+
+def claim_jobs(model, limit: int = 1):
+    """Claims up to `limit` queued jobs of the given model.
+
+    The rows are locked with `SELECT ... FOR UPDATE SKIP LOCKED` and flipped to
+    RUNNING in the same transaction, so concurrent workers (threads or
+    processes) never pick up the same job. Running jobs whose lease expired
+    are claimed as well.
+    """
+    db = router.db_for_write(model)
+    with transaction.atomic(using=db):
+        jobs = list(claimable(model, db)[:limit])
+        if jobs:
+            claim(model, db, jobs)
+    return jobs
+
+
+def claim_job_batch(limit: int):
+    """Claims the oldest queued job and up to `limit - 1` compatible ones.
+
+    Jobs are compatible if they share the action, the center and the
+    checklist, and can therefore go into one ENA submission.
+    """
+    db = router.db_for_write(Job)
+    with transaction.atomic(using=db):
+        queued = claimable(Job, db)
+        first = queued.first()
+        if first is None:
+            return []
+        jobs = [first]
+        action, center, checklist = batch_key(first)
+        if limit > 1 and center and checklist:
+            jobs += list(
+                queued.filter(
+                    action=action, data__center_name=center, data__checklist=checklist
+                ).exclude(pk=first.pk)[: limit - 1]
+            )
+        claim(Job, db, jobs)
+    return jobs
+
+
+def fail_job(job, ex: Exception):
+    metrics.inc(
+        "ena_upload_job_errors_total",
+        model=job._meta.model_name,
+        kind=type(ex).__name__,
+    )
+    job.status = "ERROR"
+    job.raw_result = ex
+    job.save()
+    log.exception(ex)
+    log.exception(ex.__traceback__)
+
+
+def process_job(job: Job):
+    log.info(f"Handling queued job {job}...")
+    with timings.track([job]):
+        try:
+            ena_upload(job)
+        except Exception as ex:
+            fail_job(job, ex)
+
+
+def process_job_batch(jobs: list):
+    log.info(f"Handling batch of {len(jobs)} queued jobs: {', '.join(map(str, jobs))}")
+    with timings.track(jobs):
+        for job, ex in ena_upload_batch(jobs):
+            fail_job(job, ex)
+
+
+def process_analysisjob(job: AnalysisJob):
+    log.info(f"Handling queued analysis job {job}...")
+    with timings.track([job], kind="WEBIN"):
+        try:
+            if job.analysisjob_files.count() > 0:
+                webin_upload(job)
+            else:
+                log.warning(f"Analysis job {job} has no assigned files!")
+                metrics.inc(
+                    "ena_upload_job_errors_total", model="analysisjob", kind="no_files"
+                )
+                job.status = "ERROR"
+                job.raw_result = "Analysis job has no assigned files!"
+                job.save()
+        except Exception as ex:
+            fail_job(job, ex)
+
+
+def drain_queue(batch_size: int = 1):
+    """Processes queued jobs until none are left to claim.
+
+    With a `batch_size` above one, compatible jobs are submitted together.
+    Returns the number of handled jobs and analysis jobs.
+    """
+    handled = 0
+    while True:
+        close_old_connections()
+        if batch_size > 1:
+            jobs = claim_job_batch(batch_size)
+            if jobs:
+                with _leases.hold(Job, jobs):
+                    process_job_batch(jobs)
+        else:
+            jobs = claim_jobs(Job)
+            for job in jobs:
+                with _leases.hold(Job, [job]):
+                    process_job(job)
+        analysisjobs = claim_jobs(AnalysisJob)
+        for analysisjob in analysisjobs:
+            with _leases.hold(AnalysisJob, [analysisjob]):
+                process_analysisjob(analysisjob)
+        if not jobs and not analysisjobs:
+            return handled
+        handled += len(jobs) + len(analysisjobs)
+
+
+def work(stop: threading.Event = None, batch_size: int = 1):
+    """The worker loop: drain the queue, then wait for new jobs.
+
+    The worker is woken up by a NOTIFY as soon as a job gets queued and polls
+    every ENA_UPLOAD_FREQ_SECS as a safety net.
+    """
+    stop = stop or threading.Event()
+    listener = QueueListener()
+    _leases.start()
+    try:
+        while not stop.is_set():
+            log.debug(
+                f"{'[DEV] ' if config.ENA_USE_DEV_ENDPOINT else ''}Handling queued jobs..."
+            )
+            drain_queue(batch_size)
+            listener.wait(settings.ENA_UPLOAD_FREQ_SECS, stop)
+    finally:
+        listener.close()
+        connections.close_all()
+
+
+def run_workers(workers: int, batch_size: int = 1):
+    """Runs `workers` worker loops in threads of this process.
+
+    Every thread uses its own database connection, so the threads claim jobs
+    independently of each other and of workers in other processes.
+    """
+    if workers <= 1:
+        work(batch_size=batch_size)
+        return
+
+    stop = threading.Event()
+    threads = [
+        threading.Thread(
+            target=work, args=(stop, batch_size), name=f"worker-{i}", daemon=True
+        )
+        for i in range(workers)
+    ]
+    for thread in threads:
+        thread.start()
+    try:
+        while any(thread.is_alive() for thread in threads):
+            for thread in threads:
+                thread.join(timeout=1)
+    except KeyboardInterrupt:
+        log.info("Stopping workers...")
+        stop.set()
+        for thread in threads:
+            thread.join()
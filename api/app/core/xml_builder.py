@@ -0,0 +1,106 @@
+import threading
+
+from django.conf import settings
+from genshi.template import TemplateLoader
+from rest_framework.exceptions import ValidationError
+
+from core import log
+
+SCHEMA_TEMPLATES = {
+    "study": "ENA_template_studies.xml",
+    "experiment": "ENA_template_experiments.xml",
+    "run": "ENA_template_runs.xml",
+}
+SUBMISSION_TEMPLATE = "ENA_template_submission.xml"
+
+_loader = None
+_loader_lock = threading.Lock()
+
+
+def template_loader() -> TemplateLoader:
+    """The process wide template loader.
+
+    Genshi keeps the parsed templates (including the `xi:include`d ones) in
+    the loader, so each template is parsed only once per process.
+    """
+    global _loader
+    with _loader_lock:
+        if _loader is None:
+            _loader = TemplateLoader(
+                search_path=[settings.ENA_XML_TEMPLATE_DIR],
+                auto_reload=False,
+                max_cache_size=200,
+            )
+        return _loader
+
+
+def template_name(schema: str, checklist: str = None):
+    if schema == "sample":
+        return f"ENA_template_samples_{checklist}.xml"
+    return SCHEMA_TEMPLATES[schema]
+
+
+def render(name: str, **data) -> bytes:
+    """Renders a template to XML bytes."""
+    template = template_loader().load(name)
+    try:
+        return template.generate(**data).render(method="xml", encoding="utf-8")
+    except SystemExit as ex:
+        # The templates exit if a mandatory value is missing (the field is
+        # printed to the log by the template)
+        raise ValidationError(f"Cannot build the XML of {name}: {ex}")
+
+
+def schema_xml(schema: str, targets, center: str, checklist: str, tool: dict):
+    """Renders the XML of one schema (`study`, `sample`, `experiment`, `run`)."""
+    log.debug(f"Building {schema} XML...")
+    if schema == "run":
+        # A run can have several files, there is one row per file
+        data = {
+            "run_groups": targets.groupby("alias", sort=False)["experiment_alias"]
+            .first()
+            .to_dict(),
+            "file_groups": targets.groupby("alias", sort=False),
+        }
+    else:
+        data = {"df": targets}
+    return render(
+        template_name(schema, checklist),
+        center=center,
+        tool_name=tool["tool_name"],
+        tool_version=tool["tool_version"],
+        **data,
+    )
+
+
+def schema_xmls(schema_targets: dict, center: str, checklist: str, tool: dict):
+    """Renders the XMLs of all schemas. Returns a dict of schema and bytes."""
+    return {
+        schema: schema_xml(schema, targets, center, checklist, tool)
+        for schema, targets in schema_targets.items()
+    }
+
+
+def source_name(schema: str):
+    """The file name under which a schema XML is sent to ENA."""
+    return f"{schema}.xml"
+
+
+def submission_xml(action: str, schemas, center: str, tool: dict) -> bytes:
+    """Renders the submission XML.
+
+    :param schemas: for ADD and MODIFY the schemas that are submitted, for
+        CANCEL and RELEASE a dict of schema and targets with accessions
+    """
+    if action in ["ADD", "MODIFY"]:
+        source = {schema: source_name(schema) for schema in schemas}
+    else:
+        source = schemas
+    return render(
+        SUBMISSION_TEMPLATE,
+        action=action,
+        input=source,
+        center=center,
+        tool_name=tool["tool_name"],
+        tool_version=tool["tool_version"],
+    )
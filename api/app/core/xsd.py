@@ -0,0 +1,68 @@
+import threading
+from os.path import join
+
+from django.conf import settings
+from lxml import etree
+from rest_framework.exceptions import ValidationError
+
+from core import log
+
+# The XSD of each document, keyed by the root element of the document
+XSD_FILES = {
+    "STUDY_SET": "SRA.study.xsd",
+    "PROJECT_SET": "ENA.project.xsd",
+    "SAMPLE_SET": "SRA.sample.xsd",
+    "EXPERIMENT_SET": "SRA.experiment.xsd",
+    "RUN_SET": "SRA.run.xsd",
+    "SUBMISSION_SET": "SRA.submission.xsd",
+}
+
+_schemas = {}
+_schemas_lock = threading.Lock()
+
+
+def xml_schema(xsd_file: str) -> etree.XMLSchema:
+    """Returns the compiled XSD. Each XSD is compiled once per process."""
+    with _schemas_lock:
+        if xsd_file not in _schemas:
+            log.debug(f"Compiling {xsd_file}...")
+            path = join(settings.ENA_XML_TEMPLATE_DIR, xsd_file)
+            _schemas[xsd_file] = etree.XMLSchema(etree.parse(path))
+        return _schemas[xsd_file]
+
+
+def validate_xml(xml: bytes) -> list:
+    """Validates a document against the XSD of its root element.
+
+    Returns the list of errors, which is empty if the document is valid.
+    """
+    try:
+        document = etree.fromstring(xml)
+    except etree.XMLSyntaxError as ex:
+        return [str(ex)]
+    xsd_file = XSD_FILES.get(document.tag)
+    if xsd_file is None:
+        return [f"Unknown document type {document.tag}."]
+    schema = xml_schema(xsd_file)
+    # The compiled schema keeps the error log of the last validation
+    with _schemas_lock:
+        if schema.validate(document):
+            return []
+        return [f"line {error.line}: {error.message}" for error in schema.error_log]
+
+
+def validate_xmls(xmls: dict) -> dict:
+    """Validates the documents (name and bytes). Returns the errors by name."""
+    errors = {}
+    for name, xml in xmls.items():
+        document_errors = validate_xml(xml)
+        if document_errors:
+            errors[name] = document_errors
+    return errors
+
+
+def check_xmls(xmls: dict):
+    """Raises a ValidationError with all errors if any document is invalid."""
+    errors = validate_xmls(xmls)
+    if errors:
+        raise ValidationError(errors)
@@ -1,9 +1,12 @@
 from constance import config
+from django.conf import settings
 
 
 class dynamic_settings:
     @classmethod
     def ENA_ENDPOINT(cls):
+        if settings.ENA_SUBMIT_URL:
+            return settings.ENA_SUBMIT_URL
         return (
             "https://wwwdev.ebi.ac.uk/ena/submit/drop-box/submit/?auth=ENA"
             if config.ENA_USE_DEV_ENDPOINT
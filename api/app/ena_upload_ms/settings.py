@@ -186,6 +186,10 @@ REST_FRAMEWORK = {
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
     "PAGE_SIZE": 10,
 }
+# The maximal page size clients can select with ?page_size=
+MAX_PAGE_SIZE = int(environ.get("MAX_PAGE_SIZE", 1000))
+# The maximal number of jobs created with one bulk request
+MAX_BULK_JOBS = int(environ.get("MAX_BULK_JOBS", 1000))
 
 if DISABLE_BROWSABLE_API:
     REST_FRAMEWORK["DEFAULT_RENDERER_CLASSES"] = [
@@ -291,11 +295,83 @@ SPECTACULAR_SETTINGS = {
 ENA_USERNAME = environ.get("ENA_USERNAME", None)
 ENA_PASSWORD = environ.get("ENA_PASSWORD", None)
 
-# How long to wait after queued jobs were processed
+# How long to wait after queued jobs were processed, if the worker is not
+# woken up earlier by a notification about a newly queued job
 ENA_UPLOAD_FREQ_SECS = int(environ.get("ENA_UPLOAD_FREQ_SECS", 60))
-# How long to wait after running the upload command
+# Initial interval between two submissions to ENA. The effective rate adapts
+# to the health of ENA within the limits of ENA_RATE_LIMITS.
 ENA_UPLOAD_THROTTLE_SECS = int(environ.get("ENA_UPLOAD_THROTTLE_SECS", 5))
+# Calls per second towards ENA per budget: drop-box submissions, FTP sessions
+# and webin-cli invocations
+ENA_RATE_LIMITS = {
+    "submit": {
+        "rate": 1 / max(ENA_UPLOAD_THROTTLE_SECS, 0.1),
+        "min_rate": 1 / 300,
+        "max_rate": float(environ.get("ENA_SUBMIT_MAX_RATE", 2)),
+    },
+    "ftp": {
+        "rate": 1 / max(ENA_UPLOAD_THROTTLE_SECS, 0.1),
+        "min_rate": 1 / 300,
+        "max_rate": float(environ.get("ENA_FTP_MAX_RATE", 2)),
+    },
+    "webin": {
+        "rate": 1 / max(ENA_UPLOAD_THROTTLE_SECS, 0.1),
+        "min_rate": 1 / 300,
+        "max_rate": float(environ.get("ENA_WEBIN_MAX_RATE", 1)),
+    },
+}
+# How long a validation request of the API waits for the webin budget before
+# it is answered with a 503
+ENA_VALIDATE_WAIT_SECS = float(environ.get("ENA_VALIDATE_WAIT_SECS", 10))
+# How many workers process the queue concurrently (per upload_process)
+ENA_UPLOAD_WORKERS = int(environ.get("ENA_UPLOAD_WORKERS", 1))
+# After how long a RUNNING job is claimed again. The workers renew the leases
+# of their jobs, so only the jobs of crashed or killed workers expire.
+ENA_JOB_LEASE_SECS = int(environ.get("ENA_JOB_LEASE_SECS", 600))
+# How many compatible jobs are combined into one submission (1 = no batching)
+ENA_UPLOAD_BATCH_SIZE = int(environ.get("ENA_UPLOAD_BATCH_SIZE", 1))
+# How many files are hashed concurrently and in which chunks
+ENA_HASH_WORKERS = int(environ.get("ENA_HASH_WORKERS", 4))
+ENA_HASH_CHUNK_SIZE = int(environ.get("ENA_HASH_CHUNK_SIZE", 8 * 1024 * 1024))
+# Block size of the FTP uploads
+ENA_FTP_BLOCK_SIZE = int(environ.get("ENA_FTP_BLOCK_SIZE", 1024 * 1024))
+# Maximum number of FTPS sessions per process, how long idle sessions are
+# kept open and over how many sessions the files of one job are uploaded
+ENA_FTP_POOL_SIZE = int(environ.get("ENA_FTP_POOL_SIZE", 4))
+ENA_FTP_IDLE_SECS = int(environ.get("ENA_FTP_IDLE_SECS", 60))
+ENA_FTP_PARALLEL_UPLOADS = int(environ.get("ENA_FTP_PARALLEL_UPLOADS", 2))
+# Resume the partial uploads of this service instead of uploading the files
+# again (only if the local file did not change)
+ENA_FTP_RESUME = (environ.get("ENA_FTP_RESUME", "True")) == "True"
+# How long looked up taxonomy entries are cached and how many are kept in
+# memory per process
+ENA_TAXONOMY_TTL_SECS = int(environ.get("ENA_TAXONOMY_TTL_SECS", 30 * 24 * 3600))
+ENA_TAXONOMY_LRU_SIZE = int(environ.get("ENA_TAXONOMY_LRU_SIZE", 4096))
+ENA_TAXONOMY_URL = environ.get(
+    "ENA_TAXONOMY_URL", "https://www.ebi.ac.uk/ena/taxonomy/rest"
+)
+# The HTTP connection pool to ENA (drop-box, taxonomy and reports), the
+# timeouts in seconds and the retries of failed connects and idempotent calls
+ENA_HTTP_POOL_SIZE = int(environ.get("ENA_HTTP_POOL_SIZE", 10))
+ENA_HTTP_CONNECT_TIMEOUT = float(environ.get("ENA_HTTP_CONNECT_TIMEOUT", 10))
+ENA_HTTP_READ_TIMEOUT = float(environ.get("ENA_HTTP_READ_TIMEOUT", 300))
+ENA_HTTP_RETRIES = int(environ.get("ENA_HTTP_RETRIES", 3))
+ENA_HTTP_BACKOFF_SECS = float(environ.get("ENA_HTTP_BACKOFF_SECS", 0.5))
 TEMPLATE_DIR = "/templates"
+# How often the template files are checked for changes
+ENA_TEMPLATE_CHECK_SECS = int(environ.get("ENA_TEMPLATE_CHECK_SECS", 5))
+# The ENA services, they can be pointed to a local stand-in (see fake_ena).
+# The drop-box url defaults to the (dev) endpoint of ENA.
+ENA_SUBMIT_URL = environ.get("ENA_SUBMIT_URL")
+ENA_FTP_HOST = environ.get("ENA_FTP_HOST", "webin2.ebi.ac.uk")
+ENA_FTP_PORT = int(environ.get("ENA_FTP_PORT", 21))
+ENA_WEBIN_CLI = environ.get("ENA_WEBIN_CLI", "/usr/bin/java -jar /opt/webin-cli.jar")
+# The ENA XML templates (genshi) used to build the submissions
+ENA_XML_TEMPLATE_DIR = "/ena_templates"
+# Validate the XMLs against the XSDs before they are submitted
+ENA_XSD_VALIDATION = (environ.get("ENA_XSD_VALIDATION", "True")) == "True"
+# Validate the jobs against the checklists when they are created or modified
+ENA_CHECKLIST_VALIDATION = (environ.get("ENA_CHECKLIST_VALIDATION", "True")) == "True"
 DATA_DIR = "/data"
 ENA_SUBMISSION_TOOL = "ena_upload_ms"
 ENA_SUBMISSION_TOOL_VERSION = environ.get("GIT_VERSION", "v0.99.0")
@@ -17,7 +17,7 @@ Including another URLconf
 
 import re
 
-from core.views import Dev
+from core.views import Dev, Metrics
 from django.conf import settings
 from django.contrib import admin
 from django.urls import include, path, re_path
@@ -60,6 +60,11 @@ urlpatterns = [
         Dev.as_view(),
         name="dev",
     ),
+    path(
+        f"{prefix}api/metrics",
+        Metrics.as_view(),
+        name="metrics",
+    ),
 ]
 
 if not settings.DEBUG:
@@ -0,0 +1,6 @@
+"""A local stand-in of the ENA services for benchmarks and offline tests.
+
+It serves the drop-box (returning RECEIPT XMLs), the taxonomy and the report
+API over HTTP, an FTPS server accepting any login and a webin-cli stub (see
+`fake_ena.webin_cli`). Run it with `python -m fake_ena --help`.
+"""
@@ -0,0 +1,71 @@
+import argparse
+import logging
+import threading
+
+from .config import FakeConfig
+from .ftps import ftps_server
+from .server import FakeENAServer
+
+log = logging.getLogger("fake_ena")
+
+OVERRIDES = [
+    ("latency", float),
+    ("jitter", float),
+    ("error_rate", float),
+    ("reject_rate", float),
+    ("ftp_latency", float),
+    ("ftp_error_rate", float),
+    ("seed", int),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="fake_ena", description="Local stand-in of the ENA services."
+    )
+    parser.add_argument("--bind", default="127.0.0.1")
+    parser.add_argument("--http-port", type=int, default=8042)
+    parser.add_argument(
+        "--ftp-port", type=int, default=2121, help="0 disables the FTPS server"
+    )
+    parser.add_argument("--ftp-root", help="defaults to a temporary directory")
+    parser.add_argument("--certfile", help="defaults to a self-signed certificate")
+    parser.add_argument("--config", help="JSON file, defaults to $FAKE_ENA_CONFIG")
+    parser.add_argument("--verbose", action="store_true")
+    for name, kind in OVERRIDES:
+        parser.add_argument(f"--{name.replace('_', '-')}", type=kind)
+    args = parser.parse_args()
+    logging.basicConfig(
+        level=logging.DEBUG if args.verbose else logging.INFO,
+        format="%(asctime)s %(name)s %(levelname)s %(message)s",
+    )
+
+    config = FakeConfig.load(args.config)
+    for name, _ in OVERRIDES:
+        if getattr(args, name) is not None:
+            config.values[name] = getattr(args, name)
+    if args.seed is not None:
+        config.random.seed(args.seed)
+
+    http = FakeENAServer((args.bind, args.http_port), config)
+    threading.Thread(target=http.serve_forever, daemon=True).start()
+    base = f"http://{args.bind}:{args.http_port}"
+    log.info(f"ENA_SUBMIT_URL={base}/ena/submit/drop-box/submit/?auth=ENA")
+    log.info(f"ENA_TAXONOMY_URL={base}/ena/taxonomy/rest")
+    try:
+        if args.ftp_port:
+            ftps = ftps_server(
+                (args.bind, args.ftp_port), config, args.ftp_root, args.certfile
+            )
+            log.info(f"ENA_FTP_HOST={args.bind} ENA_FTP_PORT={args.ftp_port}")
+            ftps.serve_forever()
+        else:
+            threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        http.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+import json
+import random
+import re
+import threading
+import time
+from os import environ
+
+DEFAULTS = {
+    # Latency (seconds) of each drop-box, taxonomy and report call and the
+    # jitter added to all latencies
+    "latency": 0.0,
+    "jitter": 0.0,
+    # Share of drop-box calls answered with HTTP 503
+    "error_rate": 0.0,
+    # Share of submissions rejected with an unsuccessful receipt
+    "reject_rate": 0.0,
+    # Submissions having a document matching a pattern are rejected
+    "reject": [],
+    # Known scientific names and their taxon ids
+    "taxonomy": {
+        "Homo sapiens": "9606",
+        "Mus musculus": "10090",
+        "Escherichia coli": "562",
+        "Severe acute respiratory syndrome coronavirus 2": "2697049",
+        "human gut metagenome": "408170",
+    },
+    # Latency and failure rate of each FTP upload
+    "ftp_latency": 0.0,
+    "ftp_error_rate": 0.0,
+    # Latency and failure rate of each webin-cli call
+    "webin_latency": 0.0,
+    "webin_error_rate": 0.0,
+    # Seed of the random generator, to get reproducible runs
+    "seed": None,
+}
+
+
+class FakeConfig:
+    """The behaviour of the fake ENA services.
+
+    The values are read from a JSON file (see DEFAULTS for the keys), the
+    path of which is taken from the FAKE_ENA_CONFIG environment variable if
+    it is not given.
+    """
+
+    def __init__(self, values: dict = None):
+        unknown = set(values or {}) - set(DEFAULTS)
+        if unknown:
+            raise ValueError(f"Unknown settings: {', '.join(sorted(unknown))}")
+        self.values = {**DEFAULTS, **(values or {})}
+        self.random = random.Random(self.values["seed"])
+        self.lock = threading.Lock()
+        self.rules = [
+            (re.compile(rule["pattern"]), rule.get("message", rule["pattern"]))
+            for rule in self.values["reject"]
+        ]
+
+    @classmethod
+    def load(cls, path: str = None):
+        path = path or environ.get("FAKE_ENA_CONFIG")
+        if not path:
+            return cls()
+        with open(path, "r") as cf:
+            return cls(json.load(cf))
+
+    def __getitem__(self, key: str):
+        return self.values[key]
+
+    def delay(self, prefix: str = ""):
+        """Sleeps for the configured latency (`latency`, `ftp_latency`, ...)."""
+        with self.lock:
+            jitter = self.random.uniform(-1, 1) * self.values["jitter"]
+        latency = self.values[f"{prefix}latency"] + jitter
+        if latency > 0:
+            time.sleep(latency)
+
+    def fails(self, rate: str):
+        """Returns True with the probability of the given rate setting."""
+        with self.lock:
+            return self.random.random() < self.values[rate]
+
+    def rejections(self, documents: dict) -> list:
+        """Returns the messages of the rules matching any of the documents."""
+        messages = []
+        for pattern, message in self.rules:
+            for name, document in documents.items():
+                if pattern.search(document.decode("utf-8", errors="replace")):
+                    messages.append(f"{name}: {message}")
+        return messages
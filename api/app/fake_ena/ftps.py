@@ -0,0 +1,79 @@
+import logging
+import subprocess
+import tempfile
+from os import makedirs
+from os.path import join
+
+from .config import FakeConfig
+
+log = logging.getLogger("fake_ena")
+
+
+def self_signed_certificate(directory: str) -> str:
+    """Creates a self-signed certificate (with its key) for localhost."""
+    certfile = join(directory, "fake_ena.pem")
+    subprocess.run(
+        [
+            "openssl",
+            "req",
+            "-x509",
+            "-newkey",
+            "rsa:2048",
+            "-nodes",
+            "-days",
+            "7",
+            "-subj",
+            "/CN=localhost",
+            "-keyout",
+            certfile,
+            "-out",
+            certfile,
+        ],
+        check=True,
+        capture_output=True,
+    )
+    return certfile
+
+
+def ftps_server(
+    address: tuple, config: FakeConfig, root: str = None, certfile: str = None
+):
+    """Returns an FTPS server accepting any login, like the webin FTP server.
+
+    Each user gets its own directory below `root`. Requires pyftpdlib and
+    pyopenssl (see requirements.dev.txt).
+    """
+    try:
+        from pyftpdlib.authorizers import DummyAuthorizer
+        from pyftpdlib.handlers import TLS_FTPHandler
+        from pyftpdlib.servers import ThreadedFTPServer
+    except ImportError as ex:
+        raise RuntimeError(
+            f"The FTPS stand-in requires pyftpdlib and pyopenssl: {ex}"
+        ) from ex
+
+    root = root or tempfile.mkdtemp(prefix="fake_ena_ftp_")
+    certfile = certfile or self_signed_certificate(root)
+
+    class AnyUserAuthorizer(DummyAuthorizer):
+        def validate_authentication(self, username, password, handler):
+            if not self.has_user(username):
+                home = join(root, username)
+                makedirs(home, exist_ok=True)
+                self.add_user(username, password, home, perm="elradfmwMT")
+
+    class FakeFTPSHandler(TLS_FTPHandler):
+        def ftp_STOR(self, file, mode="w"):
+            config.delay("ftp_")
+            if config.fails("ftp_error_rate"):
+                self.respond("451 Requested action aborted (ftp_error_rate).")
+                return
+            return super().ftp_STOR(file, mode)
+
+    FakeFTPSHandler.certfile = certfile
+    FakeFTPSHandler.tls_control_required = True
+    FakeFTPSHandler.tls_data_required = True
+    FakeFTPSHandler.authorizer = AnyUserAuthorizer()
+    FakeFTPSHandler.passive_ports = range(40000, 40100)
+    log.info(f"FTPS root: {root}")
+    return ThreadedFTPServer(address, FakeFTPSHandler)
@@ -0,0 +1,154 @@
+import threading
+from datetime import date, datetime, timedelta, timezone
+
+from lxml import etree
+
+# The accession prefixes of the submitted objects and of their external ids
+PREFIXES = {
+    "STUDY": ("ERP", ("PRJEB", "Project")),
+    "PROJECT": ("PRJEB", None),
+    "SAMPLE": ("ERS", ("SAMEA", "biosample")),
+    "EXPERIMENT": ("ERX", None),
+    "RUN": ("ERR", None),
+    "ANALYSIS": ("ERZ", None),
+    "SUBMISSION": ("ERA", None),
+}
+
+
+class AccessionRegistry:
+    """Assigns accessions to the submitted objects and remembers them by alias.
+
+    A modified object keeps its accession, like at ENA.
+    """
+
+    def __init__(self, start: int = 10000000):
+        self.counter = start
+        self.accessions = {}
+        self.lock = threading.Lock()
+
+    def next(self, prefix: str):
+        with self.lock:
+            self.counter += 1
+            return f"{prefix}{self.counter}"
+
+    def assign(self, kind: str, alias: str):
+        """Returns the accession and the external id of an object."""
+        with self.lock:
+            if (kind, alias) in self.accessions:
+                return self.accessions[(kind, alias)]
+        prefix, ext = PREFIXES[kind]
+        accession = self.next(prefix)
+        ext_id = (self.next(ext[0]), ext[1]) if ext else None
+        with self.lock:
+            return self.accessions.setdefault((kind, alias), (accession, ext_id))
+
+    def lookup(self, accession: str):
+        """Returns the kind and alias of an accession, or None if it is unknown."""
+        with self.lock:
+            for (kind, alias), (known, ext_id) in self.accessions.items():
+                if accession == known or (ext_id and accession == ext_id[0]):
+                    return kind, alias
+        return None
+
+
+def now():
+    return datetime.now(timezone.utc)
+
+
+def new_receipt(success: bool):
+    return etree.Element(
+        "RECEIPT",
+        receiptDate=now().isoformat(timespec="milliseconds").replace("+00:00", "Z"),
+        submissionFile="submission.xml",
+        success="true" if success else "false",
+    )
+
+
+def add_messages(receipt, infos=(), errors=()):
+    messages = etree.SubElement(receipt, "MESSAGES")
+    for error in errors:
+        etree.SubElement(messages, "ERROR").text = error
+    for info in infos:
+        etree.SubElement(messages, "INFO").text = info
+
+
+def to_bytes(receipt) -> bytes:
+    return etree.tostring(
+        receipt, xml_declaration=True, encoding="UTF-8", pretty_print=True
+    )
+
+
+def rejected(errors: list) -> bytes:
+    """An unsuccessful receipt with the given errors."""
+    receipt = new_receipt(False)
+    add_messages(receipt, errors=errors)
+    return to_bytes(receipt)
+
+
+def parse_actions(submission: bytes) -> list:
+    """Returns the actions (tag and attributes) of a submission XML."""
+    root = etree.fromstring(submission)
+    return [
+        (element.tag, dict(element.attrib))
+        for element in root.iterfind("SUBMISSION/ACTIONS/ACTION/*")
+    ]
+
+
+def accepted(
+    registry: AccessionRegistry, actions: list, documents: dict, test: bool
+) -> bytes:
+    """A successful receipt of the submitted documents.
+
+    :param actions: the actions of the submission, see `parse_actions`
+    :param documents: the submitted XMLs by their file name
+    :param test: the submission was sent to the test (dev) service
+    """
+    receipt = new_receipt(True)
+    infos = []
+    hold = any(tag == "HOLD" for tag, _ in actions)
+    hold_until = (date.today() + timedelta(days=730)).isoformat() + "Z"
+    for tag, attributes in actions:
+        if tag in ["ADD", "MODIFY"]:
+            root = etree.fromstring(documents[attributes["source"]])
+            for element in root:
+                if not isinstance(element.tag, str) or element.tag not in PREFIXES:
+                    continue
+                alias = element.get("alias")
+                accession, ext_id = registry.assign(element.tag, alias)
+                item = etree.SubElement(
+                    receipt,
+                    element.tag,
+                    accession=accession,
+                    alias=alias,
+                    status="PRIVATE",
+                )
+                if hold and element.tag in ["STUDY", "SAMPLE"]:
+                    item.set("holdUntilDate", hold_until)
+                if ext_id:
+                    etree.SubElement(
+                        item, "EXT_ID", accession=ext_id[0], type=ext_id[1]
+                    )
+        elif tag in ["RELEASE", "CANCEL"]:
+            target = attributes["target"]
+            known = registry.lookup(target)
+            kind = known[0].lower() if known else "object"
+            if tag == "RELEASE":
+                infos.append(f'{kind} accession "{target}" is set to public status.')
+            else:
+                infos.append(f'{kind} accession "{target}" is cancelled.')
+    etree.SubElement(
+        receipt,
+        "SUBMISSION",
+        accession=registry.next("ERA"),
+        alias=f"SUBMISSION-{now().strftime('%d-%m-%Y-%H:%M:%S:%f')[:-3]}",
+    )
+    if hold:
+        infos.append("All objects in this submission are set to private status (HOLD).")
+    if test:
+        infos.append(
+            "This submission is a TEST submission and will be discarded within 24 hours"
+        )
+    add_messages(receipt, infos=infos)
+    for tag, _ in actions:
+        etree.SubElement(receipt, "ACTIONS").text = tag
+    return to_bytes(receipt)
@@ -0,0 +1,150 @@
+import json
+import logging
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+
+from lxml import etree
+
+from . import receipts
+from .config import FakeConfig
+
+log = logging.getLogger("fake_ena")
+
+SUBMIT_PATH = "/ena/submit/drop-box/submit/"
+TAXONOMY_PATH = "/ena/taxonomy/rest/"
+REPORT_PATH = "/ena/submit/report/"
+
+
+def parse_multipart(content_type: str, body: bytes) -> dict:
+    """Returns the parts of a multipart/form-data body as (file name, bytes)
+    tuples by their field name."""
+    message = BytesParser(policy=HTTP).parsebytes(
+        f"Content-Type: {content_type}\r\n\r\n".encode("utf-8") + body
+    )
+    if not message.is_multipart():
+        return {}
+    return {
+        part.get_param("name", header="content-disposition"): (
+            part.get_filename(),
+            part.get_payload(decode=True),
+        )
+        for part in message.iter_parts()
+    }
+
+
+class FakeENAServer(ThreadingHTTPServer):
+    """The fake drop-box, taxonomy and report services."""
+
+    daemon_threads = True
+
+    def __init__(self, address, config: FakeConfig, registry=None):
+        super().__init__(address, FakeENAHandler)
+        self.config = config
+        self.registry = registry or receipts.AccessionRegistry()
+        taxonomy = config["taxonomy"]
+        self.taxon_ids = {name.lower(): taxon_id for name, taxon_id in taxonomy.items()}
+        self.scientific_names = {taxon_id: name for name, taxon_id in taxonomy.items()}
+
+
+class FakeENAHandler(BaseHTTPRequestHandler):
+    server: FakeENAServer
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        log.debug(format % args)
+
+    def send(self, status: int, body: bytes, content_type: str = "application/xml"):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_json(self, status: int, data):
+        self.send(status, json.dumps(data).encode("utf-8"), "application/json")
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        config = self.server.config
+        config.delay()
+        if url.path != SUBMIT_PATH:
+            return self.send(404, b"Not found")
+        if config.fails("error_rate"):
+            return self.send(503, b"Service temporarily unavailable")
+
+        parts = parse_multipart(self.headers.get("Content-Type", ""), body)
+        if "SUBMISSION" not in parts:
+            return self.send(200, receipts.rejected(["No SUBMISSION was submitted."]))
+        documents = {
+            filename or name.lower(): content
+            for name, (filename, content) in parts.items()
+            if name != "SUBMISSION"
+        }
+        try:
+            actions = receipts.parse_actions(parts["SUBMISSION"][1])
+            for tag, attributes in actions:
+                source = attributes.get("source")
+                if source and source not in documents:
+                    raise ValueError(f"The source {source} was not submitted.")
+            errors = config.rejections(documents)
+            if not errors and config.fails("reject_rate"):
+                errors = ["The submission was rejected (reject_rate)."]
+            if errors:
+                receipt = receipts.rejected(errors)
+            else:
+                receipt = receipts.accepted(
+                    self.server.registry,
+                    actions,
+                    documents,
+                    "test" in parse_qs(url.query),
+                )
+        except (etree.XMLSyntaxError, ValueError, KeyError) as ex:
+            receipt = receipts.rejected([f"Invalid submission: {ex}"])
+        self.send(200, receipt)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        self.server.config.delay()
+        if url.path.startswith(TAXONOMY_PATH):
+            return self.taxonomy(url.path[len(TAXONOMY_PATH) :])
+        if url.path.startswith(REPORT_PATH):
+            return self.report(url.path[len(REPORT_PATH) :])
+        self.send(404, b"Not found")
+
+    def taxonomy(self, path: str):
+        kind, _, value = path.partition("/")
+        value = unquote(value).strip()
+        if kind == "scientific-name":
+            taxon_id = self.server.taxon_ids.get(value.lower())
+            if taxon_id:
+                return self.send_json(
+                    200, [{"taxId": taxon_id, "scientificName": value}]
+                )
+        elif kind == "tax-id":
+            name = self.server.scientific_names.get(value)
+            if name:
+                return self.send_json(200, {"taxId": value, "scientificName": name})
+        self.send(404, b"No results.", "text/plain")
+
+    def report(self, path: str):
+        accession = path.rstrip("/").rpartition("/")[2]
+        known = self.server.registry.lookup(accession)
+        if known is None:
+            return self.send_json(404, [])
+        kind, alias = known
+        self.send_json(
+            200,
+            [
+                {
+                    "report": {
+                        "id": accession,
+                        "alias": alias,
+                        "type": kind,
+                        "releaseStatus": "PRIVATE",
+                    }
+                }
+            ],
+        )
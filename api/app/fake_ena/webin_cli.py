@@ -0,0 +1,84 @@
+"""A stub of webin-cli for the fake ENA.
+
+Usage (ENA_WEBIN_CLI="python -m fake_ena.webin_cli"):
+
+    python -m fake_ena.webin_cli -context genome -manifest <file> -submit
+
+The manifest must exist and name the assembly (NAME or ASSEMBLYNAME) and its
+files, which must exist as well. The latency and the failure rate are taken
+from the FAKE_ENA_CONFIG file (`webin_latency`, `webin_error_rate`).
+"""
+
+import argparse
+import random
+import sys
+from os.path import dirname, isfile, join
+
+from .config import FakeConfig
+
+FILE_FIELDS = ["FASTA", "FLATFILE", "AGP", "CHROMOSOME_LIST", "UNLOCALISED_LIST"]
+# webin-cli exits with 2 on user errors and 3 on system errors
+USER_ERROR = 2
+SYSTEM_ERROR = 3
+
+
+def parse_manifest(path: str) -> dict:
+    fields = {}
+    with open(path, "r") as mf:
+        for line in mf:
+            key, _, value = line.strip().partition(" ")
+            if key:
+                fields.setdefault(key.upper(), []).append(value.strip())
+    return fields
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="webin-cli", prefix_chars="-")
+    parser.add_argument("-context", required=True)
+    parser.add_argument("-manifest", required=True)
+    parser.add_argument("-username")
+    parser.add_argument("-password")
+    parser.add_argument("-submit", action="store_true")
+    parser.add_argument("-validate", action="store_true")
+    parser.add_argument("-test", action="store_true")
+    parser.add_argument("-ascp", action="store_true")
+    args = parser.parse_args(argv)
+    config = FakeConfig.load()
+    config.delay("webin_")
+
+    if config.fails("webin_error_rate"):
+        print("ERROR: A server error occurred when connecting to the Webin service.")
+        return SYSTEM_ERROR
+    if not isfile(args.manifest):
+        print(f"ERROR: Unreadable file: {args.manifest}")
+        return USER_ERROR
+
+    fields = parse_manifest(args.manifest)
+    errors = []
+    if not (fields.get("NAME") or fields.get("ASSEMBLYNAME")):
+        errors.append(f"Missing manifest field: NAME. File: {args.manifest}")
+    for field in FILE_FIELDS:
+        for file in fields.get(field, []):
+            path = join(dirname(args.manifest), file)
+            if not isfile(path):
+                errors.append(f"Invalid {field} file name. Could not read file: {path}")
+    if errors:
+        for error in errors:
+            print(f"ERROR: {error}")
+        print("ERROR: Submission validation failed because of a user error.")
+        return USER_ERROR
+
+    print("INFO : Submission(s) validated successfully.")
+    if args.submit:
+        accession = f"ERZ{random.randint(10000000, 99999999)}"
+        if args.test:
+            print("INFO : This was a TEST submission(s).")
+        print(
+            "INFO : The submission has been completed successfully. The following "
+            f"analysis accession was assigned to the submission: {accession}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())